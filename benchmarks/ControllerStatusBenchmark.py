@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+""" Benchmark of the time RobotController.controllerStatus() takes per tick, for every supported
+    controller profile, using a virtual joystick so no game controller needs to be connected.
+
+    Each profile is timed with the status display off and on (redrawn every tick), for each
+    pattern of input:
+        idle: No controls change
+        light: The left stick moves every 5 ticks and a button changes every 20 ticks
+        storm: Every axis changes and every button toggles every tick, and the hat moves round
+    and with callback functions for no controls, a typical robot (left stick, hat and four buttons)
+    and every control.
+
+    The input rate is not limited, so the times are the cost of the library and the do nothing
+    callback functions alone. Like SDL, the virtual joystick posts a pygame event for each change,
+    so the storm times include filling and draining the event queue. Results are printed as a
+    table, and can also be written to a JSON file with --json so results from different releases
+    can be compared.
+
+    Runs without a monitor using the SDL dummy video driver.
+"""
+
+import argparse
+import json
+import os
+import platform
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from pygamecontroller import RobotController, VirtualBackend, VirtualJoystick
+
+
+TICKS = 5000
+
+TYPICAL_CALLBACKS = ("leftStick", "hat", "triangleBtn", "squareBtn", "circleBtn", "crossXBtn")
+
+HAT_POSITIONS = ((0, 0), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+
+
+def handler(*values):
+    """ Callback function which does nothing """
+    pass
+
+
+def idleInput(joystick):
+    """ Generator leaving every control at rest """
+    while True:
+        yield None
+
+
+def lightInput(joystick):
+    """ Generator moving the left stick every 5 ticks and pressing or releasing a button every 20 """
+    tick = 0
+    button = joystick.profile.crossBBtn
+    while True:
+        tick += 1
+        if tick % 5 == 0:
+            joystick.setAxis(joystick.profile.leftStickLR, (tick % 200) / 100.0 - 1.0)
+        if tick % 20 == 0 and button != -1:
+            joystick.setButton(button, 1 - joystick.buttons[button])
+        yield None
+
+
+def stormInput(joystick):
+    """ Generator changing every axis and toggling every button and the hat every tick """
+    tick = 0
+    while True:
+        tick += 1
+        for axis in range(len(joystick.axes)):
+            joystick.setAxis(axis, ((tick + axis) % 200) / 100.0 - 1.0)
+        for button in range(len(joystick.buttons)):
+            joystick.setButton(button, tick % 2)
+        for hat in range(len(joystick.hats)):
+            joystick.setHat(hat, HAT_POSITIONS[tick % len(HAT_POSITIONS)])
+        yield None
+
+
+INPUTS = (("idle", idleInput), ("light", lightInput), ("storm", stormInput))
+
+
+def callbackArgs(callbacks):
+    """ Returns the RobotController arguments setting the callback functions for the named set """
+    if callbacks == "none":
+        names = ()
+    elif callbacks == "typical":
+        names = TYPICAL_CALLBACKS
+    else:
+        names = RobotController.CONTROL_NAMES
+    return { name + "Changed": handler for name in names }
+
+
+def timeTicks(profile, display, inputName, inputGenerator, callbacks, ticks):
+    """ Returns the mean and worst time in microseconds of one call of controllerStatus() """
+    joystick = VirtualJoystick(profile)
+    controller = RobotController("Benchmark", lambda status: None, inputRate = 0,
+                                 displayRate = 1000000, headless = not display,
+                                 backend = VirtualBackend([joystick]), **callbackArgs(callbacks))
+    joystick.drive( inputGenerator(joystick) )
+    #Warm up the caches of rendered text
+    for tick in range(100):
+        controller.controllerStatus()
+
+    worst = 0.0
+    start = time.perf_counter()
+    for tick in range(ticks):
+        tickStart = time.perf_counter()
+        controller.controllerStatus()
+        tickTime = time.perf_counter() - tickStart
+        if tickTime > worst:
+            worst = tickTime
+    mean = (time.perf_counter() - start) / ticks
+    pygame.quit()
+    return mean * 1000000, worst * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time RobotController.controllerStatus() per tick")
+    parser.add_argument("--ticks", type=int, default=TICKS, help="ticks timed for each case")
+    parser.add_argument("--profile", help="only time profiles whose name contains this text")
+    parser.add_argument("--json", help="file to write the results to as JSON")
+    args = parser.parse_args()
+
+    results = []
+    print("controllerStatus() time per tick, {} ticks, mean / worst in microseconds".format(args.ticks) )
+    print("{:40} {:8} {:6} {:8} {:>10} {:>10}".format("Controller", "Display", "Input", "Callbacks", "Mean", "Worst") )
+    for profile in RobotController.PROFILES:
+        if args.profile and args.profile not in profile.name:
+            continue
+        for display in (False, True):
+            for inputName, inputGenerator in INPUTS:
+                for callbacks in ("none", "typical", "all"):
+                    mean, worst = timeTicks(profile, display, inputName, inputGenerator, callbacks, args.ticks)
+                    results.append({"profile": profile.name, "displayName": profile.displayName,
+                                    "display": display, "input": inputName, "callbacks": callbacks,
+                                    "meanMicroseconds": round(mean, 3), "worstMicroseconds": round(worst, 3)})
+                    print("{:40} {:8} {:6} {:8} {:>10.2f} {:>10.2f}".format(profile.displayName[:40],
+                          "on" if display else "off", inputName, callbacks, mean, worst) )
+
+    if args.json:
+        with open(args.json, "w") as resultsFile:
+            json.dump({"ticks": args.ticks, "python": platform.python_version(),
+                       "pygame": pygame.version.ver, "machine": platform.machine(),
+                       "platform": platform.platform(), "results": results}, resultsFile, indent=2)
+        print("Results written to {}".format(args.json) )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+""" Microbenchmark of the time RobotController takes to read the controller each tick, for every
+    supported controller profile. A virtual joystick impersonating each controller is used, so no
+    game controller needs to be connected.
+
+    Two cases are timed for each profile. With the status display turned off and callbacks for
+    the left stick, hat and four buttons (a typical robot), and with the status display turned on
+    so every control the controller has is read. For comparison, the time taken to read the same
+    controller the way it was read before the poll plan was added is shown as the baseline. That
+    read every control on every tick, looking up the index of each control in the tuples of
+    indices for all the supported controllers.
+
+    Runs without a monitor using the SDL dummy video driver.
+"""
+
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from pygamecontroller import RobotController, VirtualBackend, VirtualJoystick
+
+
+TICKS = 20000
+
+
+def handler(*values):
+    """ Callback function which does nothing """
+    pass
+
+
+class BaselineReader:
+    """ Reads the controller as RobotController.controllerStatus() did before the poll plan, without
+        the status display, clock or event handling. The states of the controls are kept here so
+        the RobotController being compared is not changed.
+    """
+    leftTriggerIdx = RobotController.leftTriggerIdx
+    rightTriggerIdx = RobotController.rightTriggerIdx
+    leftStickLRIdx = RobotController.leftStickLRIdx
+    leftStickUDIdx = RobotController.leftStickUDIdx
+    rightStickLRIdx = RobotController.rightStickLRIdx
+    rightStickUDIdx = RobotController.rightStickUDIdx
+    leftBtn1Idx = RobotController.leftBtn1Idx
+    rightBtn1Idx = RobotController.rightBtn1Idx
+    leftBtn2Idx = RobotController.leftBtn2Idx
+    rightBtn2Idx = RobotController.rightBtn2Idx
+    leftStickPressIdx = RobotController.leftStickPressIdx
+    rightStickPressIdx = RobotController.rightStickPressIdx
+    triangleXBtnIdx = RobotController.triangleXBtnIdx
+    squareYBtnIdx = RobotController.squareYBtnIdx
+    circleABtnIdx = RobotController.circleABtnIdx
+    crossBBtnIdx = RobotController.crossBBtnIdx
+    selectBtnIdx = RobotController.selectBtnIdx
+    homeBtnIdx = RobotController.homeBtnIdx
+    startBtnIdx = RobotController.startBtnIdx
+    starBtnIdx = RobotController.starBtnIdx
+    hatLeftIdx = RobotController.hatLeftIdx
+    hatRightIdx = RobotController.hatRightIdx
+    hatUpIdx = RobotController.hatUpIdx
+    hatDownIdx = RobotController.hatDownIdx
+    hatIdx = RobotController.hatIdx
+
+    leftTriggerActivated = False
+    rightTriggerActivated = False
+    leftTriggerPos = -1.0
+    rightTriggerPos = -1.0
+    leftStickLR = 0.0
+    leftStickUD = 0.0
+    rightStickLR = 0.0
+    rightStickUD = 0.0
+    leftBtn1State = 0
+    rightBtn1State = 0
+    leftBtn2State = 0
+    rightBtn2State = 0
+    hatLRState = 0
+    hatUDState = 0
+    leftStickPressedState = 0
+    rightStickPressedState = 0
+    selectBtnState = 0
+    homeBtnState = 0
+    startBtnState = 0
+    starBtnState = 0
+    triangleBtnState = 0
+    squareBtnState = 0
+    circleBtnState = 0
+    crossXBtnState = 0
+
+    def __init__(self, robotController):
+        self.controller = robotController.controller
+        self.DETECTED_JOYSTICK_IDX = robotController.DETECTED_JOYSTICK_IDX
+        for callbackName in ("leftTriggerChanged", "rightTriggerChanged", "leftStickChanged",
+                             "rightStickChanged", "hatChanged", "leftBtn1Changed", "rightBtn1Changed",
+                             "leftBtn2Changed", "rightBtn2Changed", "leftStickPressChanged",
+                             "rightStickPressChanged", "selectBtnChanged", "homeBtnChanged",
+                             "startBtnChanged", "starBtnChanged", "triangleBtnChanged",
+                             "squareBtnChanged", "circleBtnChanged", "crossXBtnChanged"):
+            setattr(self, callbackName, getattr(robotController, callbackName) )
+
+    def read(self):
+        """ Reads every control once """
+        #Process analogue sticks
+        if (self.leftStickLRIdx[self.DETECTED_JOYSTICK_IDX] != -1
+        and self.leftStickUDIdx[self.DETECTED_JOYSTICK_IDX] != -1 ):
+            leftStickLR = self.controller.get_axis( self.leftStickLRIdx[self.DETECTED_JOYSTICK_IDX] )
+            leftStickUD = self.controller.get_axis( self.leftStickUDIdx[self.DETECTED_JOYSTICK_IDX] )
+            if (self.leftStickChanged is not None
+            and ( self.leftStickLR != leftStickLR or self.leftStickUD != leftStickUD ) ):
+                self.leftStickLR = leftStickLR
+                self.leftStickUD = leftStickUD
+                self.leftStickChanged( self.leftStickLR, self.leftStickUD )
+
+        if (self.rightStickLRIdx[self.DETECTED_JOYSTICK_IDX] != -1
+        and self.rightStickUDIdx[self.DETECTED_JOYSTICK_IDX] != -1 ):
+            rightStickLR = self.controller.get_axis( self.rightStickLRIdx[self.DETECTED_JOYSTICK_IDX] )
+            rightStickUD = self.controller.get_axis( self.rightStickUDIdx[self.DETECTED_JOYSTICK_IDX] )
+            if (self.rightStickChanged is not None
+            and ( self.rightStickLR != rightStickLR or self.rightStickUD != rightStickUD ) ):
+                self.rightStickLR = rightStickLR
+                self.rightStickUD = rightStickUD
+                self.rightStickChanged( self.rightStickLR, self.rightStickUD )
+
+        #Process analogue triggers
+        if self.leftTriggerIdx[self.DETECTED_JOYSTICK_IDX] != -1 :
+            leftTrigger = self.controller.get_axis( self.leftTriggerIdx[self.DETECTED_JOYSTICK_IDX] )
+            if self.leftTriggerActivated == False :
+                if leftTrigger != 0.0 :
+                    self.leftTriggerActivated = True
+            if (self.leftTriggerChanged is not None
+            and self.leftTriggerActivated == True
+            and self.leftTriggerPos != leftTrigger ):
+                self.leftTriggerPos = leftTrigger
+                self.leftTriggerChanged( self.leftTriggerPos )
+
+        if self.rightTriggerIdx[self.DETECTED_JOYSTICK_IDX] != -1:
+            rightTrigger = self.controller.get_axis( self.rightTriggerIdx[self.DETECTED_JOYSTICK_IDX] )
+            if self.rightTriggerActivated == False :
+                if rightTrigger != 0.0 :
+                    self.rightTriggerActivated = True
+            if (self.rightTriggerChanged is not None
+            and self.rightTriggerActivated == True
+            and self.rightTriggerPos != rightTrigger ):
+                self.rightTriggerPos = rightTrigger
+                self.rightTriggerChanged( self.rightTriggerPos )
+
+        #Process Hats
+        hatLR = self.hatLRState
+        hatUD = self.hatUDState
+        if self.hatIdx[self.DETECTED_JOYSTICK_IDX] != -1:
+            hatState = self.controller.get_hat( self.hatIdx[self.DETECTED_JOYSTICK_IDX] )
+            hatLR = hatState[0]
+            hatUD = hatState[1]
+        elif (self.hatUpIdx[self.DETECTED_JOYSTICK_IDX] != -1
+        and   self.hatDownIdx[self.DETECTED_JOYSTICK_IDX] != -1
+        and   self.hatLeftIdx[self.DETECTED_JOYSTICK_IDX] != -1
+        and   self.hatRightIdx[self.DETECTED_JOYSTICK_IDX] != -1 ):
+            hatUpBtn = self.controller.get_button( self.hatUpIdx[self.DETECTED_JOYSTICK_IDX] )
+            hatDownBtn = self.controller.get_button( self.hatDownIdx[self.DETECTED_JOYSTICK_IDX] )
+            if hatUpBtn == 1 :
+                hatUD = 1
+            elif hatDownBtn == 1 :
+                hatUD = -1
+            else:
+                hatUD = 0
+            hatLeftBtn = self.controller.get_button( self.hatLeftIdx[self.DETECTED_JOYSTICK_IDX] )
+            hatRightBtn = self.controller.get_button( self.hatRightIdx[self.DETECTED_JOYSTICK_IDX] )
+            if hatLeftBtn == 1 :
+                hatLR = -1
+            elif hatRightBtn == 1 :
+                hatLR = 1
+            else:
+                hatLR = 0
+
+        if (self.hatChanged is not None
+        and (self.hatUDState != hatUD or self.hatLRState != hatLR) ):
+            self.hatUDState = hatUD
+            self.hatLRState = hatLR
+            self.hatChanged( self.hatLRState, self.hatUDState )
+
+        #Process buttons
+        self.leftBtn1State = self.processButton(
+            self.leftBtn1Idx[self.DETECTED_JOYSTICK_IDX], self.leftBtn1State, self.leftBtn1Changed)
+        self.rightBtn1State = self.processButton(
+            self.rightBtn1Idx[self.DETECTED_JOYSTICK_IDX], self.rightBtn1State, self.rightBtn1Changed)
+        if self.leftTriggerIdx[self.DETECTED_JOYSTICK_IDX] == -1 :
+            self.leftBtn2State = self.processButton(
+                self.leftBtn2Idx[self.DETECTED_JOYSTICK_IDX], self.leftBtn2State, self.leftBtn2Changed)
+        if self.rightTriggerIdx[self.DETECTED_JOYSTICK_IDX] == -1 :
+            self.rightBtn2State = self.processButton(
+                self.rightBtn2Idx[self.DETECTED_JOYSTICK_IDX], self.rightBtn2State, self.rightBtn2Changed)
+        self.leftStickPressedState = self.processButton(
+            self.leftStickPressIdx[self.DETECTED_JOYSTICK_IDX], self.leftStickPressedState,
+            self.leftStickPressChanged)
+        self.rightStickPressedState = self.processButton(
+            self.rightStickPressIdx[self.DETECTED_JOYSTICK_IDX], self.rightStickPressedState,
+            self.rightStickPressChanged)
+        self.selectBtnState = self.processButton(
+            self.selectBtnIdx[self.DETECTED_JOYSTICK_IDX], self.selectBtnState, self.selectBtnChanged)
+        self.homeBtnState = self.processButton(
+            self.homeBtnIdx[self.DETECTED_JOYSTICK_IDX], self.homeBtnState, self.homeBtnChanged)
+        self.startBtnState = self.processButton(
+            self.startBtnIdx[self.DETECTED_JOYSTICK_IDX], self.startBtnState, self.startBtnChanged)
+        self.starBtnState = self.processButton(
+            self.starBtnIdx[self.DETECTED_JOYSTICK_IDX], self.starBtnState, self.starBtnChanged)
+        self.triangleBtnState = self.processButton(
+            self.triangleXBtnIdx[self.DETECTED_JOYSTICK_IDX], self.triangleBtnState, self.triangleBtnChanged)
+        self.squareBtnState = self.processButton(
+            self.squareYBtnIdx[self.DETECTED_JOYSTICK_IDX], self.squareBtnState, self.squareBtnChanged)
+        self.circleBtnState = self.processButton(
+            self.circleABtnIdx[self.DETECTED_JOYSTICK_IDX], self.circleBtnState, self.circleBtnChanged)
+        self.crossXBtnState = self.processButton(
+            self.crossBBtnIdx[self.DETECTED_JOYSTICK_IDX], self.crossXBtnState, self.crossXBtnChanged)
+
+    def processButton(self, btnIdx, lastState, btnCallback):
+        """ Reads one button, calling its callback function if the state changed """
+        if btnIdx != -1:
+            btnState = self.controller.get_button( btnIdx )
+            if (btnCallback is not None
+            and lastState != btnState ):
+                lastState = btnState
+                btnCallback( btnState )
+        return lastState
+
+
+def createController(profile):
+    """ Creates a RobotController connected to a virtual joystick for one of the supported controllers """
+    return RobotController("Benchmark", lambda status: None,
+                           backend = VirtualBackend([VirtualJoystick(profile)]),
+                           leftStickChanged = handler, hatChanged = handler,
+                           triangleBtnChanged = handler, squareBtnChanged = handler,
+                           circleBtnChanged = handler, crossXBtnChanged = handler)
+
+
+def timeTicks(read):
+    """ Returns the mean time in microseconds for one call of the read function """
+    start = time.perf_counter()
+    for i in range(TICKS):
+        read()
+    return (time.perf_counter() - start) * 1000000 / TICKS
+
+
+def main():
+    #Connect all the controllers first, so their detection messages are not printed in the table
+    controllers = [createController(profile) for profile in RobotController.PROFILES]
+    print("Time to read the controller per tick, {} ticks".format(TICKS) )
+    print("{:40} {:>12} {:>12} {:>12}".format("Controller", "Baseline", "Display off", "Display on") )
+    for profile, controller in zip(RobotController.PROFILES, controllers):
+        baseline = timeTicks( BaselineReader(controller).read )
+        controller.displayControllerOutput = False
+        displayOff = timeTicks(controller._pollControls)
+        controller.displayControllerOutput = True
+        displayOn = timeTicks(controller._pollControls)
+        print("{:40} {:>9.2f} us {:>9.2f} us {:>9.2f} us".format(
+            profile.displayName, baseline, displayOff, displayOn) )
+
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+""" Benchmark comparing the time taken and memory used to start pygame the way RobotController
+    did before (pygame.init(), starting every pygame module including sound and fonts) against
+    starting only the modules it needs: the joystick and display modules when headless, and the
+    font module as well when a window is shown.
+
+    Each case is run in a new Python process, so the times include loading the SDL libraries the
+    modules need. Importing pygame is timed separately, as it is the same for every case. The
+    resident memory (RSS) of the process is measured after starting pygame.
+    Results are printed as a table, and can also be written to a JSON file with --json.
+
+    Runs without a monitor using the SDL dummy video driver.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+
+RUNS = 10
+
+#Code starting pygame for each case
+CASES = (
+    ("pygame.init()", "pygame.init(); pygame.joystick.init()"),
+    ("headless", "pygame.display.init(); pygame.joystick.init()"),
+    ("window", "pygame.display.init(); pygame.joystick.init(); pygame.font.init()"),
+)
+
+#Program run in a new process for each case, printing the time to import pygame, the time to start
+#it and the RSS in kB
+PROGRAM = """
+import time
+start = time.perf_counter()
+import pygame
+imported = time.perf_counter()
+{}
+started = time.perf_counter()
+rss = 0
+with open("/proc/self/status") as status:
+    for line in status:
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1])
+print(imported - start, started - imported, rss)
+"""
+
+
+def runCase(code):
+    """ Runs the start up code in a new process, returning the time taken to import pygame and to
+        start it in seconds, and the RSS in kB
+    """
+    env = dict(os.environ, SDL_VIDEODRIVER = os.environ.get("SDL_VIDEODRIVER", "dummy"),
+               PYGAME_HIDE_SUPPORT_PROMPT = "1")
+    output = subprocess.check_output([sys.executable, "-c", PROGRAM.format(code)], env=env)
+    importTime, startTime, rss = output.split()[-3:]
+    return float(importTime), float(startTime), int(rss)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the cost of the ways of starting pygame")
+    parser.add_argument("--runs", type=int, default=RUNS, help="processes started for each case")
+    parser.add_argument("--json", help="file to write the results to as JSON")
+    args = parser.parse_args()
+
+    results = []
+    print("Time to start pygame and resident memory, best of {} runs".format(args.runs) )
+    print("{:16} {:>12} {:>12} {:>12}".format("Case", "Import", "Start", "RSS") )
+    for name, code in CASES:
+        runs = [runCase(code) for run in range(args.runs)]
+        importTime = min(run[0] for run in runs)
+        startTime = min(run[1] for run in runs)
+        rss = min(run[2] for run in runs)
+        results.append({"case": name, "importSeconds": round(importTime, 6),
+                         "startSeconds": round(startTime, 6), "rssKilobytes": rss})
+        print("{:16} {:>9.1f} ms {:>9.1f} ms {:>9} kB".format(name, importTime * 1000, startTime * 1000, rss) )
+
+    if args.json:
+        with open(args.json, "w") as resultsFile:
+            json.dump({"runs": args.runs, "python": platform.python_version(),
+                       "machine": platform.machine(), "platform": platform.platform(),
+                       "results": results}, resultsFile, indent=2)
+        print("Results written to {}".format(args.json) )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+""" Benchmark comparing the time taken to draw the controller status screen by rendering every
+    line with the font on every frame, against the TextPrint class which caches rendered lines.
+    The screen layout matches the status display of a Sony PS4 controller on the default 400x500
+    window. Two cases are timed: with the sticks and triggers moving so their values change every
+    frame, and with the controller at rest. The time taken just to clear the screen is shown for
+    reference, as this is a fixed cost of every frame.
+
+    Runs without a monitor using the SDL dummy video driver.
+"""
+
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from pygamecontroller import TextPrint
+
+
+FRAMES = 2000
+
+#Lines of the status screen as (label, kind of value) pairs. A value kind of None is a plain label.
+STATUS_LINES = (
+    ("Controller: Sony PS4 Wireless Controller", None),
+    ("Left Stick:", None),
+    ("Left/Right: ", "axis"),
+    ("Up/Down: ", "axis"),
+    ("Right Stick:", None),
+    ("Left/Right: ", "axis"),
+    ("Up/Down: ", "axis"),
+    ("Front Analogue Triggers:", None),
+    ("Left Trigger: ", "axis"),
+    ("Right Trigger: ", "axis"),
+    ("4-way hat:", None),
+    ("Left/Right: ", "hat"),
+    ("Up/Down: ", "hat"),
+    ("Simple buttons:", None),
+    ("Left Trigger Button 1: ", "button"),
+    ("Right Trigger Button 1: ", "button"),
+    ("Left Stick Pressed: ", "button"),
+    ("Right Stick Pressed: ", "button"),
+    ("Select Button: ", "button"),
+    ("Home Button: ", "button"),
+    ("Start Button: ", "button"),
+    ("Triangle Button: ", "button"),
+    ("Square Button: ", "button"),
+    ("Circle Button: ", "button"),
+    ("X-Cross Button: ", "button"),
+    ("", None),
+    ("Speed: 50, Turn: 0", None),
+)
+
+
+def frameValues(moving):
+    """ Returns a value for every line of the status screen, as the controller would report them """
+    values = []
+    for label, kind in STATUS_LINES:
+        if kind == "axis":
+            if moving:
+                values.append( random.uniform(-1.0, 1.0) )
+            else:
+                values.append( 0.0 )
+        elif kind == "hat":
+            values.append( random.choice( (-1, 0, 1) ) )
+        elif kind == "button":
+            values.append( random.choice( (0, 1) ) )
+        else:
+            values.append( None )
+    return values
+
+
+def drawRenderEveryLine(screen, font, values):
+    """ Draws the status screen the way TextPrint did before caching, rendering every line """
+    screen.fill(TextPrint.WHITE)
+    y = 10
+    for (label, kind), value in zip(STATUS_LINES, values):
+        if kind is None:
+            text = label
+        else:
+            text = label + "{}".format(value)
+        screen.blit(font.render(text, True, TextPrint.BLACK), [20, y])
+        y += 15
+
+
+def drawTextPrint(textPrint, values):
+    """ Draws the status screen using the caching TextPrint class """
+    textPrint.reset()
+    textPrint.indent()
+    for (label, kind), value in zip(STATUS_LINES, values):
+        if kind is None:
+            textPrint.print(label)
+        else:
+            textPrint.printValue(label, value)
+
+
+def timeFrames(drawFrame, frames):
+    """ Returns the mean time in milliseconds taken by the drawFrame function over all the frames """
+    start = time.perf_counter()
+    for values in frames:
+        drawFrame(values)
+    return (time.perf_counter() - start) * 1000 / len(frames)
+
+
+def main():
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode([400, 500])
+    font = pygame.font.Font(None, 20)
+    textPrint = TextPrint(screen)
+
+    print("Status screen with {} lines on a 400x500 window, {} frames".format( len(STATUS_LINES), FRAMES ) )
+    fill = timeFrames(lambda values: screen.fill(TextPrint.WHITE), [None] * FRAMES)
+    print("Clearing the screen alone: {:.3f} ms per frame".format(fill) )
+
+    random.seed(1)
+    for case, moving in (("Sticks moving", True), ("Controller at rest", False)):
+        frames = [frameValues(moving) for i in range(FRAMES)]
+
+        #Warm up both methods, so the TextPrint cache is populated as it would be after the first frame
+        timeFrames(lambda values: drawRenderEveryLine(screen, font, values), frames[:10])
+        timeFrames(lambda values: drawTextPrint(textPrint, values), frames[:10])
+
+        renderEveryLine = timeFrames(lambda values: drawRenderEveryLine(screen, font, values), frames)
+        cached = timeFrames(lambda values: drawTextPrint(textPrint, values), frames)
+
+        print(case)
+        print("    Render every line: {:.3f} ms per frame".format(renderEveryLine) )
+        print("    Cached TextPrint:  {:.3f} ms per frame".format(cached) )
+        print("    Reduction:         {:.0f}% ({:.0f}% excluding clearing the screen)".format(
+            100 * (1 - cached / renderEveryLine), 100 * (1 - (cached - fill) / (renderEveryLine - fill)) ) )
+
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -148,6 +148,11 @@ def main():
 
         if cnt.initialised :
             keepRunning = True
+            #Smooth the sticks and triggers so jitter does not make the servos buzz, and only
+            #pass on changes big enough to move a servo
+            for control in ("leftStick", "rightStick", "leftTrigger", "rightTrigger"):
+                cnt.setSmoothing(control, "damped", responseTime = 0.1)
+                cnt.setDeadzone(control, minChange = 0.01)
             resetArm()
         else:
             keepRunning = False
@@ -259,6 +259,11 @@ def main():
 
         if cnt.initialised :
             keepRunning = True
+            #Updating the Blinkt is slow, so limit how often the sticks and triggers update it
+            for control in ("leftStick", "rightStick", "leftTrigger", "rightTrigger"):
+                cnt.setRateLimit(control, 20)
+            #Showing the IP address takes several seconds, so do it on a worker thread
+            cnt.setCallbackPolicy("selectBtn", "worker")
             blkt.set_all(0,255,0)
             blkt.show()
         else:
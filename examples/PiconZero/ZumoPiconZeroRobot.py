@@ -17,7 +17,10 @@ import piconzero3 as pz
 import hcsr04_bcm as hcsr04
 
 #Global variables
-message = ""
+#Drive status text. It is set by the stick callback on the input thread and read by the main loop.
+#Setting a string is a single reference assignment, so the main loop always reads a complete
+#message without needing a lock.
+driveMessage = ""
 
 
 def leftStickChangeHandlerV2(valLR, valUD):
@@ -51,8 +54,8 @@ def leftStickChangeHandlerV2(valLR, valUD):
             else:
                 speedL -= speedReduction
 
-    global message
-    message = mode + " Speed L: {}, Speed R: {}".format( speedL, speedR ) 
+    global driveMessage
+    driveMessage = mode + " Speed L: {}, Speed R: {}".format( speedL, speedR ) 
     
     #Set LEDs based on motor speeds
     colR = 0
@@ -89,8 +92,6 @@ def startBtnHandler(btnState):
         showIP()
     
 def main():
-    global message
-    
     ## Check that required hardware is connected ##
 
     #Initialise the controller board
@@ -114,20 +115,27 @@ def main():
     #Run in try..finally structure so that program exits gracefully on hitting any
     #errors in the callback functions
     try:
+        #Reading the distance sensor can take a long time, so the controller is read and the motor
+        #callbacks are run on the input thread to keep the robot responsive to the sticks meanwhile
         cnt = RobotController("Zumo Robot with Blinkt", initStatus,
                               leftStickChanged = leftStickChangeHandlerV2,
-                              startBtnChanged = startBtnHandler)
+                              startBtnChanged = startBtnHandler,
+                              inputThread = True, inputThreadCallbacks = True)
         
         if cnt.initialised :
             keepRunning = True
+            #Showing the IP address takes several seconds, so do it on a worker thread rather
+            #than holding up the stick callback on the input thread
+            cnt.setCallbackPolicy("startBtn", "worker")
             blkt.set_all(0,255,0)
             blkt.show()
         else:
             keepRunning = False
             
         # -------- Main Program Loop -----------
+        distance = 1000
         while keepRunning == True :
-            cnt.message = message
+            cnt.message = driveMessage + " Distance {}".format(distance)
             
             # Trigger stick events and check for quit
             keepRunning = cnt.controllerStatus()
@@ -138,8 +146,6 @@ def main():
                 distance = testDist
             else:
                 distance = 1000
-                
-            message = "Distance {}".format(distance)
     
     finally:
         #Clean up and turn off Blinkt LEDs
@@ -9,7 +9,7 @@
 """
 import pygame #random, math
 from time import sleep
-from pygamecontroller import RobotController
+from pygamecontroller import RobotController, ResponseCurve
 import sentinelboard
 import blinkt
 
@@ -25,7 +25,14 @@ ledDir = 1 #Direction LED scanning cursor is moving
 # Sets amount speed is divided by to make turns less twitchy
 defaultSpeedDampening = 1.3 #1=full batt. voltage, 2=half max speed
 slowModeSpeedDampening = 3 #2=half speed, 3=third max speed
-speedDampening = defaultSpeedDampening
+
+# Response curves applied to the sticks by the controller for each speed mode
+defaultSpeedCurve = ResponseCurve.linear(1 / defaultSpeedDampening)
+slowModeSpeedCurve = ResponseCurve.linear(1 / slowModeSpeedDampening)
+turboSpeedCurve = ResponseCurve.linear(1) # Fast mode (full speed)
+speedCurve = defaultSpeedCurve
+
+cnt = None
 
 sb = sentinelboard.SentinelBoard()
 
@@ -146,33 +153,39 @@ def rightTrigChangeHandler(val):
 def leftStickChangeHandler(valLR, valUD):
     """Handler function for left analogue stick"""
     global power
-    power = valUD/speedDampening
+    power = valUD
 
 
 def rightStickChangeHandler(valLR, valUD):
     """Handler function for right analogue stick"""
     global turn
-    turn = valLR/speedDampening
+    turn = valLR
+
+
+def setSpeedCurve(curve):
+    """Shapes both sticks with the response curve for a speed mode"""
+    global speedCurve
+    speedCurve = curve
+    cnt.setResponseCurve("leftStick", curve)
+    cnt.setResponseCurve("rightStick", curve)
 
 
 def leftFrontBtn1Handler(val):
-    global speedDampening
     if val == 1 :
-        speedDampening = slowModeSpeedDampening # Slow mode
+        setSpeedCurve(slowModeSpeedCurve) # Slow mode
     else :
-        speedDampening = defaultSpeedDampening
+        setSpeedCurve(defaultSpeedCurve)
 
 
 def rightFrontBtn1Handler(val):
-    global speedDampening
     if val == 1 :
-        speedDampening = 1 # Fast mode (full speed)
+        setSpeedCurve(turboSpeedCurve) # Fast mode (full speed)
     else :
-        speedDampening = defaultSpeedDampening
+        setSpeedCurve(defaultSpeedCurve)
 
 
 def main():
-    global message, ledPos, ledDir
+    global message, ledPos, ledDir, cnt
     ## Check that required hardware is connected ##
 
     #Initialise the controller board
@@ -191,6 +204,7 @@ def main():
 
         if cnt.initialised :
             keepRunning = True
+            setSpeedCurve(defaultSpeedCurve)
             #Indicate success here, we are ready to run
             blinkt.set_all(0,255,0)
             blinkt.show()
@@ -224,9 +238,9 @@ def main():
             #Update LED animation
             ledUpdateInterval += 1
             if ledUpdateInterval > 1:
-                if speedDampening == defaultSpeedDampening:
+                if speedCurve is defaultSpeedCurve:
                     ledColour = battPowerColour
-                elif speedDampening == slowModeSpeedDampening:
+                elif speedCurve is slowModeSpeedCurve:
                     ledColour = (0, 0, 100) # Show blue for slow (fine control) mode
                 else:
                     ledColour = (100, 0, 0) # Show red for full power (turbo) mode
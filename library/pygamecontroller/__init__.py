@@ -1,27 +1,124 @@
 #!/usr/bin/env python3
+import asyncio
+import os
+import signal
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque, namedtuple
 import pygame
+try:
+    #Used to update the joystick state from the input thread without processing the event queue
+    import pygame._sdl2.controller as sdlController
+except ImportError:
+    sdlController = None
+from .backends import PygameBackend, VirtualBackend, VirtualJoystick
+from .curves import ResponseCurve
+from .dispatch import InlineDispatch, RateLimiter, WorkerDispatch, WorkerPool
+from .filters import CriticallyDampedFilter, Deadzone, LowPassFilter, OneEuroFilter
+from .recording import InputRecorder, readInputLog
+from .stats import LatencyHistogram, LoopTimer
+from .watchdog import Watchdog
+from . import stats
+from .profiles import ControllerProfile, ProfileRegistry, loadDefaultProfiles
 
 
 class TextPrint:
-    """Simple class to help display text information in the application window"""
+    """Simple class to help display text information in the application window.
+    
+       Rendered text is cached so lines which do not change between frames are only rendered
+       once. When the screen is redrawn between calls to startUpdate() and finishUpdate() only
+       the lines which changed are drawn, and finishUpdate() returns the areas of the screen
+       which need updating on the display.
+    """
     BLACK    = (   0,   0,   0)
     WHITE    = ( 255, 255, 255)
     
+    # Maximum number of rendered text strings kept in the cache
+    CACHE_SIZE = 128
+    
     def __init__(self, screen):
         self.screen = screen
         self.reset()
         self.font = pygame.font.Font(None, 20)
+        self._textCache = OrderedDict()
 
     def print(self, textString):
-        textBitmap = self.font.render(textString, True, self.BLACK)
-        self.screen.blit(textBitmap, [self.x, self.y])
+        line = (self.x, self.y, textString)
+        if self._lineCount < len(self._lines):
+            lastLine, lastRect = self._lines[self._lineCount]
+            if lastLine == line:
+                #Same text already on screen at this position
+                self._lineCount += 1
+                self.y += self.line_height
+                return
+            #Erase the text previously displayed on this line
+            self.screen.fill(self.WHITE, lastRect)
+            self._dirtyRects.append(lastRect)
+        textBitmap = self._renderText(textString)
+        rect = self.screen.blit(textBitmap, [self.x, self.y])
+        self._dirtyRects.append(rect)
+        if self._lineCount < len(self._lines):
+            self._lines[self._lineCount] = (line, rect)
+        else:
+            self._lines.append( (line, rect) )
+        self._lineCount += 1
         self.y += self.line_height
         
+    def printValue(self, label, value):
+        """Displays a label followed by a value on one line. Lines are cached with their value,
+           so buttons and controls at rest are drawn from the cache rather than rendered again.
+        """
+        self.print(label + str(value))
+        
+    def _renderText(self, textString):
+        """Internal function returning the rendered bitmap for a text string, reusing
+           the bitmap from the cache if the same text was rendered recently.
+        """
+        textBitmap = self._textCache.get(textString)
+        if textBitmap is None:
+            #Rendering onto the background colour in the screen pixel format makes the bitmap
+            #much quicker to blit than a bitmap with per pixel transparency
+            textBitmap = self.font.render(textString, True, self.BLACK, self.WHITE)
+            textBitmap = textBitmap.convert(self.screen)
+            self._textCache[textString] = textBitmap
+            if len(self._textCache) > self.CACHE_SIZE:
+                #Discard the least recently used text
+                self._textCache.popitem(last=False)
+        else:
+            self._textCache.move_to_end(textString)
+        return textBitmap
+        
     def reset(self):
+        """Clears the whole screen and starts printing from the top again"""
         self.x = 10
         self.y = 10
         self.line_height = 15
         self.screen.fill(self.WHITE)
+        #Lines of text on screen as ((x, y, text), rect) tuples
+        self._lines = []
+        self._lineCount = 0
+        self._dirtyRects = [self.screen.get_rect()]
+        
+    def startUpdate(self):
+        """Starts printing from the top of the screen again without clearing it. Lines printed
+           which match the text already displayed in the same place are not redrawn.
+        """
+        self.x = 10
+        self.y = 10
+        self._lineCount = 0
+        
+    def finishUpdate(self):
+        """Erases any lines left over from the previous update and returns the list of
+           rectangles on the screen which changed, ready to pass to pygame.display.update()
+        """
+        for line, rect in self._lines[self._lineCount:]:
+            self.screen.fill(self.WHITE, rect)
+            self._dirtyRects.append(rect)
+        del self._lines[self._lineCount:]
+        dirtyRects = self._dirtyRects
+        self._dirtyRects = []
+        return dirtyRects
         
     def indent(self):
         self.x += 10
@@ -30,6 +127,126 @@ class TextPrint:
         self.x -= 10
     
 
+# Immutable snapshot of the state of every control on the controller. The field names match the
+# RobotController attributes holding the state of each control, plus the time the controller was read.
+ControllerState = namedtuple("ControllerState", (
+    "leftStickLR", "leftStickUD", "rightStickLR", "rightStickUD",
+    "leftTriggerPos", "rightTriggerPos", "hatLRState", "hatUDState",
+    "leftBtn1State", "rightBtn1State", "leftBtn2State", "rightBtn2State",
+    "leftStickPressedState", "rightStickPressedState",
+    "selectBtnState", "homeBtnState", "startBtnState", "starBtnState",
+    "triangleBtnState", "squareBtnState", "circleBtnState", "crossXBtnState",
+    "timestamp") )
+
+
+#Joystick connection events, which pygame 1 does not have
+JOYDEVICEADDED = getattr(pygame, "JOYDEVICEADDED", -1)
+JOYDEVICEREMOVED = getattr(pygame, "JOYDEVICEREMOVED", -1)
+
+#Events reporting input from a joystick
+JOYSTICK_EVENTS = frozenset( (pygame.JOYAXISMOTION, pygame.JOYBALLMOTION, pygame.JOYBUTTONDOWN,
+                              pygame.JOYBUTTONUP, pygame.JOYHATMOTION) )
+
+# A change in the state of a control, as passed to asyncio code by RobotController.events(). The
+# control is one of RobotController.CONTROL_NAMES. The value is the value passed to the callback
+# function for the control, or a (left/right, up/down) tuple for sticks and the hat.
+ControlEvent = namedtuple("ControlEvent", ("control", "value", "timestamp") )
+
+
+class _EventListener:
+    """Internal class holding the events waiting for one consumer of the asyncio API. The events
+       waiting are limited, so a consumer which stops reading does not use more and more memory.
+       Only the latest change to each analogue stick or trigger is kept, in the place of its
+       earliest change still waiting. Up to MAX_EVENTS other changes are kept, after which the
+       oldest are dropped.
+    """
+    MAX_EVENTS = 256
+    
+    ANALOGUE_CONTROLS = frozenset( ("leftStick", "rightStick", "leftTrigger", "rightTrigger") )
+    
+    def __init__(self, controls):
+        #Names of the controls the listener wants events for, or None for all controls
+        self.controls = controls
+        #Events in the order they happened. Analogue controls are queued by name, with their
+        #latest event in latestAnalogue.
+        self.events = deque()
+        self.latestAnalogue = {}
+        self.waiter = None
+    
+    def add(self, event):
+        """Queues an event for the consumer"""
+        if event.control in self.ANALOGUE_CONTROLS:
+            if event.control not in self.latestAnalogue:
+                self.events.append(event.control)
+            self.latestAnalogue[event.control] = event
+        else:
+            if len(self.events) >= self.MAX_EVENTS + len(self.latestAnalogue):
+                #The consumer has fallen behind, so drop the oldest change which is not the
+                #latest value of an analogue control
+                for position, waiting in enumerate(self.events):
+                    if not isinstance(waiting, str):
+                        del self.events[position]
+                        break
+            self.events.append(event)
+    
+    def nextEvent(self):
+        """Removes and returns the oldest event waiting"""
+        event = self.events.popleft()
+        if isinstance(event, str):
+            event = self.latestAnalogue.pop(event)
+        return event
+
+
+class _DisplaySchedule:
+    """Internal class which decides when the application window is due to be redrawn, so the window
+       is redrawn at the display rate however often the controller is read
+    """
+    def __init__(self):
+        self.nextTime = time.monotonic()
+    
+    def due(self, displayRate):
+        """Returns True if the window is due to be redrawn, and schedules the next redraw"""
+        now = time.monotonic()
+        if now < self.nextTime:
+            return False
+        self.nextTime += 1.0 / displayRate
+        if self.nextTime < now:
+            #Fallen behind, so restart the display schedule from now rather than catching up
+            self.nextTime = now + 1.0 / displayRate
+        return True
+
+
+class _CallbackAttribute:
+    """Internal descriptor for the callback function attributes of a RobotController, so setting a
+       callback function after the controller was detected updates the poll plan. It only handles
+       setting the attribute. The function is stored in the instance dictionary under the same
+       name, so reading a callback attribute is as quick as reading any other attribute.
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+        instance._callbackChanged(self.name)
+
+
+def _installQuitSignalHandlers(requestQuit):
+    """Makes SIGINT and SIGTERM call requestQuit(). A second signal is handled by the previously
+       installed handler.
+    """
+    def quitHandler(signum, frame):
+        requestQuit()
+        signal.signal(signum, previousHandlers[signum])
+
+    previousHandlers = {}
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            previousHandlers[signum] = signal.signal(signum, quitHandler)
+        except ValueError:
+            #Signal handlers can only be installed from the main thread
+            pass
+
+
 class RobotController:
     """ Provides a Pygame based application to detect controller input
         and interface the controller to your own code.
@@ -49,9 +266,9 @@ class RobotController:
                 A status code of 0 indicates a controller was successfully detected.
                 Status codes in the range 1 - 32 indicate attempts to detect a controller. While
                 these values are being returned, the application is waiting for a controller to
-                be connected (via cable or bluetooth). The status value indicates how many
-                attempts have been made. After 32 attempts if no supported controller has been
-                detected then the application will return the status code -1, and then exit.
+                be connected (via cable or bluetooth). The status value counts up evenly over the
+                detectTimeout. If no supported controller has been detected after status 32 then
+                the application will return the status code -1, and then exit.
             
             leftTriggerChanged: A callback function which will be passed the position value of
                 the left analogue trigger. This function will only be called when the trigger
@@ -108,394 +325,156 @@ class RobotController:
             mouseDown: A callback function which returns the position of the mouse and the button pressed down 
             
             mouseUp: A callback function which returns the position of the mouse and the button released 
-                
-        """
-    
-    # Names for supported controllers. These are the names the controllers present themselves as.
-    SUPPORTED_JOYSTICKS = ("PLAYSTATION(R)3",
-                           "Rock Candy Wireless Gamepad for PS3",
-                           "hongjingda HJD-X",
-                           "PS3/USB Corded Gamepad",
-                           "Wireless Controller",
-                           "8BitDo Pro 2",
-                           "Xbox One S",
-                           "Pro Controller",
-                           "Logitech Gamepad F710")
-    DETECTED_JOYSTICK_IDX = -1
-    
-    #Define specifications of each supported controller
-    AXES = (
-        27, # PS3 Dualshock
-        4,  # Rock Candy USB Dongle
-        6,  # Pi Hut USB Dongle
-        4,  # Argos PS3 compatible
-        6,  # PS4 Dualshock Wireless
-        6,  # 8BitDo Pro 2 (D mode)
-        6,  # 8BitDo Pro 2 (X mode)
-        4,  # 8BitDo Pro 2 (S mode)
-        6,  # Logitech Gamepad F710
-    )
-    
-    BTNS = (
-        19, # PS3 Dualshock
-        13, # Rock Candy USB Dongle
-        15, # Pi Hut USB Dongle
-        12, # Argos PS3 compatible
-        13, # PS4 Dualshock Wireless
-        16, # 8BitDo Pro 2 (D mode)
-        11, # 8BitDo Pro 2 (X mode)
-        16, # 8BitDo Pro 2 (S mode)
-        11, # Logitech Gamepad F710
-    )
+            
+            eventDriven: When set to True the controller state is updated from the joystick events in the
+                pygame event queue, instead of reading every control on every call to controllerStatus().
+                Only the callbacks for controls which reported a change are called, so an idle controller
+                costs almost nothing to service. Defaults to False (read every control each time).
+            
+            inputRate: The maximum number of times per second controllerStatus() will read the controller
+                and call the callback functions. Defaults to 20. Higher rates reduce the delay between a
+                control moving and your callback being called. A rate of 0 applies no limit, so the
+                controller is read every time controllerStatus() is called.
+            
+            displayRate: The number of times per second the application window is redrawn and the display
+                updated. Defaults to 20. This is independent of the inputRate, so the controller can be read
+                at a high rate without spending time redrawing the window on every call. The displayRate
+                must be greater than 0.
+            
+            headless: When set to True no application window is created and no status display is drawn,
+                for robots running without a monitor or X server. Defaults to False. In headless mode
+                the SDL dummy video driver is selected (unless SDL_VIDEODRIVER is already set) so the
+                pygame event queue still works without a display. There is no window to close, so the
+                program quits when it receives SIGINT or SIGTERM, or when requestQuit() is called (e.g.
+                from one of your button callback functions).
+            
+            inputThread: When set to True the controller is read on a separate background thread at the
+                inputRate, so slow code in your main loop does not delay reading the controller. The
+                latest state of all the controls can be read at any time using getState(). You still
+                need to call controllerStatus() in your main loop to check for quit and update the display.
+            
+            inputThreadCallbacks: Only used with inputThread. When True the callback functions are called
+                on the input thread as soon as a control changes, so they must be safe to run alongside
+                your main loop code. When False (the default) they are queued and called from
+                controllerStatus() on your main thread, with queued stick and trigger changes combined
+                so only the latest position is passed on.
 
-    HATS = (
-        0, # PS3 Dualshock
-        1, # Rock Candy USB Dongle
-        1, # Pi Hut USB Dongle
-        1, # Argos PS3 compatible
-        1, # PS4 Dualshock Wireless
-        1, # 8BitDo Pro 2 (D mode)
-        1, # 8BitDo Pro 2 (X mode)
-        1, # 8BitDo Pro 2 (S mode)
-        1, # Logitech Gamepad F710
+            detectTimeout: How many seconds to wait for a supported controller to be connected before
+                giving up. The initStatus callback function is passed progress values 1 to 32 spread
+                evenly over this time.
 
-    )
-    
-    '''
-        , # PS3 Dualshock
-        , # Rock Candy USB Dongle
-        , # Pi Hut USB Dongle
-        , # Argos PS3 compatible
-        , # PS4 Dualshock Wireless
-        , # 8BitDo Pro 2 (D mode)
-        , # 8BitDo Pro 2 (X mode)
-        , # 8BitDo Pro 2 (S mode)
-    )
+            connectionChanged: A callback function which is passed False when the controller is
+                disconnected while running, and True when a supported controller is connected again.
+                Before it is passed False, every control is returned to its rest position and the
+                callback functions of controls which were not at rest are called, so e.g. a robot
+                stops rather than carrying on with the last command.
 
-    '''
-
-    CONTROLLER_DISPLAY_NAMES = ("Sony PS3 Dualshock 6-axis Controller",
-                                "Rock Candy Wireless Gamepad for PS3",
-                                "ThePiHut Wiresless USB Game Controller",
-                                "Argos PS3 Compatible Gamepad",
-                                "Sony PS4 Wireless Controller",
-                                "8BitDo Pro 2 (S Mode)",
-                                "XBox One S",
-                                "8BitDo Pro 2 (S Mode)",
-                                "Logitech Gamepad F710")
-    
-    ## Define indices for each control for the different supported controllers
-    
-    # Axes
-    leftTriggerIdx = (
-        12, # PS3 Dualshock
-        -1, # Rock Candy USB Dongle
-        4,  # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        2,  # PS4 Dualshock Wireless
-        5,  # 8BitDo Pro 2 (D mode)
-        2,  # 8BitDo Pro 2 (X mode)
-        -1, # 8BitDo Pro 2 (S mode)
-        2, # Logitech Gamepad F710
-    )
-    
-    rightTriggerIdx = (
-        13, # PS3 Dualshock
-        -1, # Rock Candy USB Dongle
-        5,  # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        5,  # PS4 Dualshock Wireless
-        4,  # 8BitDo Pro 2 (D mode)
-        5,  # 8BitDo Pro 2 (X mode)
-        -1, # 8BitDo Pro 2 (S mode)
-        5, # Logitech Gamepad F710
-    )
-    
-    leftStickLRIdx = (
-        0, # PS3 Dualshock
-        0, # Rock Candy USB Dongle
-        0, # Pi Hut USB Dongle
-        0, # Argos PS3 compatible
-        0, # PS4 Dualshock Wireless
-        0, # 8BitDo Pro 2 (D mode)
-        0, # 8BitDo Pro 2 (X mode)
-        0, # 8BitDo Pro 2 (S mode)
-        0, # Logitech Gamepad F710
-    )
-    
-    leftStickUDIdx = (
-        1, # PS3 Dualshock
-        1, # Rock Candy USB Dongle
-        1, # Pi Hut USB Dongle
-        1, # Argos PS3 compatible
-        1, # PS4 Dualshock Wireless
-        1, # 8BitDo Pro 2 (D mode)
-        1, # 8BitDo Pro 2 (X mode)
-        1, # 8BitDo Pro 2 (S mode)
-        1, # Logitech Gamepad F710
-    )
-    
-    rightStickLRIdx = (
-        2, # PS3 Dualshock
-        2, # Rock Candy USB Dongle
-        2, # Pi Hut USB Dongle
-        2, # Argos PS3 compatible
-        3, # PS4 Dualshock Wireless
-        2, # 8BitDo Pro 2 (D mode)
-        3, # 8BitDo Pro 2 (X mode)
-        2, # 8BitDo Pro 2 (S mode)
-        3, # Logitech Gamepad F710
-    )
-    
-    rightStickUDIdx = (
-        3, # PS3 Dualshock
-        3, # Rock Candy USB Dongle
-        3, # Pi Hut USB Dongle
-        3, # Argos PS3 compatible
-        4, # PS4 Dualshock Wireless
-        3, # 8BitDo Pro 2 (D mode)
-        4, # 8BitDo Pro 2 (X mode)
-        3, # 8BitDo Pro 2 (S mode)
-        4, # Logitech Gamepad F710
-    )
-    
-    # Buttons
-    leftBtn1Idx = (
-        10, # PS3 Dualshock
-         4, # Rock Candy USB Dongle
-         6, # Pi Hut USB Dongle
-         4, # Argos PS3 compatible
-         4, # PS4 Dualshock Wireless
-         6, # 8BitDo Pro 2 (D mode)
-         4, # 8BitDo Pro 2 (X mode)
-         4, # 8BitDo Pro 2 (S mode)
-         4, # Logitech Gamepad F710
-    )
-    
-    rightBtn1Idx = (
-        11, # PS3 Dualshock
-         5, # Rock Candy USB Dongle
-         7, # Pi Hut USB Dongle
-         5, # Argos PS3 compatible
-         5, # PS4 Dualshock Wireless
-         7, # 8BitDo Pro 2 (D mode)
-         5, # 8BitDo Pro 2 (X mode)
-         5, # 8BitDo Pro 2 (S mode)
-         5, # Logitech Gamepad F710
-    )
-    
-    leftBtn2Idx = (
-         8, # PS3 Dualshock
-         6, # Rock Candy USB Dongle
-         8, # Pi Hut USB Dongle
-         6, # Argos PS3 compatible
-         6, # PS4 Dualshock Wireless
-         8, # 8BitDo Pro 2 (D mode)
-        -1, # 8BitDo Pro 2 (X mode)
-         6, # 8BitDo Pro 2 (S mode)
-        -1, # Logitech Gamepad F710
-    )
-    
-    rightBtn2Idx = (
-         9, # PS3 Dualshock
-         7, # Rock Candy USB Dongle
-         9, # Pi Hut USB Dongle
-         7, # Argos PS3 compatible
-         7, # PS4 Dualshock Wireless
-         9, # 8BitDo Pro 2 (D mode)
-        -1, # 8BitDo Pro 2 (X mode)
-         7, # 8BitDo Pro 2 (S mode)
-        -1, # Logitech Gamepad F710
-    )
-    
-    leftStickPressIdx = (
-         1, # PS3 Dualshock
-        10, # Rock Candy USB Dongle
-        13, # Pi Hut USB Dongle
-        10, # Argos PS3 compatible
-        11, # PS4 Dualshock Wireless
-        13, # 8BitDo Pro 2 (D mode)
-         8, # 8BitDo Pro 2 (X mode)
-        10, # 8BitDo Pro 2 (S mode)
-         9, # Logitech Gamepad F710
-    )
-    
-    rightStickPressIdx = (
-         2, # PS3 Dualshock
-        11, # Rock Candy USB Dongle
-        14, # Pi Hut USB Dongle
-        11, # Argos PS3 compatible
-        12, # PS4 Dualshock Wireless
-        14, # 8BitDo Pro 2 (D mode)
-         9, # 8BitDo Pro 2 (X mode)
-        11, # 8BitDo Pro 2 (S mode)
-        10, # Logitech Gamepad F710
-    )
-    
-    triangleXBtnIdx = (
-        12, # PS3 Dualshock
-         3, # Rock Candy USB Dongle
-         4, # Pi Hut USB Dongle
-         0, # Argos PS3 compatible
-         2, # PS4 Dualshock Wireless
-         3, # 8BitDo Pro 2 (D mode)
-         3, # 8BitDo Pro 2 (X mode)
-         3, # 8BitDo Pro 2 (S mode)
-         3, # Logitech Gamepad F710  (labelled Y)
-    )
-    
-    squareYBtnIdx = (
-        15, # PS3 Dualshock
-         0, # Rock Candy USB Dongle
-         3, # Pi Hut USB Dongle
-         3, # Argos PS3 compatible
-         3, # PS4 Dualshock Wireless
-         4, # 8BitDo Pro 2 (D mode)
-         2, # 8BitDo Pro 2 (X mode)
-         2, # 8BitDo Pro 2 (S mode)
-         2, # Logitech Gamepad F710  (labelled X)
-    )
-    
-    circleABtnIdx = (
-        13, # PS3 Dualshock
-         2, # Rock Candy USB Dongle
-         1, # Pi Hut USB Dongle
-         1, # Argos PS3 compatible
-         1, # PS4 Dualshock Wireless
-         0, # 8BitDo Pro 2 (D mode)
-         1, # 8BitDo Pro 2 (X mode)
-         1, # 8BitDo Pro 2 (S mode)
-         1, # Logitech Gamepad F710  (labelled B)
-    )
-    
-    crossBBtnIdx = (
-        14, # PS3 Dualshock
-         1, # Rock Candy USB Dongle
-         0, # Pi Hut USB Dongle
-         2, # Argos PS3 compatible
-         0, # PS4 Dualshock Wireless
-         1, # 8BitDo Pro 2 (D mode)
-         0, # 8BitDo Pro 2 (X mode)
-         0, # 8BitDo Pro 2 (S mode)
-         0, # Logitech Gamepad F710  (labelled A)
-    )
-    
-    selectBtnIdx = (
-         0, # PS3 Dualshock
-         8, # Rock Candy USB Dongle
-        10, # Pi Hut USB Dongle
-         8, # Argos PS3 compatible
-         9, # PS4 Dualshock Wireless
-        10, # 8BitDo Pro 2 (D mode)
-         6, # 8BitDo Pro 2 (X mode)
-         8, # 8BitDo Pro 2 (S mode)
-         6, # Logitech Gamepad F710 (labelled Back)
-    )
-    
-    homeBtnIdx = (
-        16, # PS3 Dualshock
-        12, # Rock Candy USB Dongle
-        12, # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        10, # PS4 Dualshock Wireless
-        12, # 8BitDo Pro 2 (D mode)
-        10, # 8BitDo Pro 2 (X mode)
-        12, # 8BitDo Pro 2 (S mode)
-         8, # Logitech Gamepad F710
-    )
-    
-    startBtnIdx = (
-         3, # PS3 Dualshock
-         9, # Rock Candy USB Dongle
-        11, # Pi Hut USB Dongle
-         9, # Argos PS3 compatible
-         8, # PS4 Dualshock Wireless
-        11, # 8BitDo Pro 2 (D mode)
-         7, # 8BitDo Pro 2 (X mode)
-         9, # 8BitDo Pro 2 (S mode)
-         7, # Logitech Gamepad F710
-    )
-    
-    starBtnIdx = (
-        -1, # PS3 Dualshock
-        -1, # Rock Candy USB Dongle
-        -1, # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        -1, # PS4 Dualshock Wireless
-        -1, # 8BitDo Pro 2 (D mode)
-        -1, # 8BitDo Pro 2 (X mode)
-        13, # 8BitDo Pro 2 (S mode)
-        -1, # Logitech Gamepad F710
-    )
+            backend: Where the joysticks are found (see the backends module). Defaults to the joysticks
+                connected to the computer. Pass a VirtualBackend to run with virtual joysticks
+                controlled from your code instead, e.g. to test a robot program with no controller.
 
+            joystick: A joystick from the backend to use instead of detecting one, e.g. one of the
+                joysticks returned by detectControllers(). Raises ValueError if it is not a supported
+                controller. To read several controllers at once use a ControllerManager.
+
+        """
     
-    # Hats which manifest as separate buttons
-    hatLeftIdx = (
-         7, # PS3 Dualshock
-        -1, # Rock Candy USB Dongle
-        -1, # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        -1, # PS4 Dualshock Wireless
-        -1, # 8BitDo Pro 2 (D mode)
-        -1, # 8BitDo Pro 2 (X mode)
-        -1, # 8BitDo Pro 2 (S mode)
-    )
-    
-    hatRightIdx = (
-         5, # PS3 Dualshock
-        -1, # Rock Candy USB Dongle
-        -1, # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        -1, # PS4 Dualshock Wireless
-        -1, # 8BitDo Pro 2 (D mode)
-        -1, # 8BitDo Pro 2 (X mode)
-        -1, # 8BitDo Pro 2 (S mode)
-        -1, # Logitech Gamepad F710
-    )
-    
-    hatUpIdx = (
-         4, # PS3 Dualshock
-        -1, # Rock Candy USB Dongle
-        -1, # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        -1, # PS4 Dualshock Wireless
-        -1, # 8BitDo Pro 2 (D mode)
-        -1, # 8BitDo Pro 2 (X mode)
-        -1, # 8BitDo Pro 2 (S mode)
-        -1, # Logitech Gamepad F710
-    )
+    # Profiles of the supported controllers, loaded from the JSON files in the controllers folder
+    # of this package. Add profiles for other controllers with PROFILES.loadFile(path) before
+    # creating the RobotController.
+    PROFILES = loadDefaultProfiles()
     
-    hatDownIdx = (
-         6, # PS3 Dualshock
-        -1, # Rock Candy USB Dongle
-        -1, # Pi Hut USB Dongle
-        -1, # Argos PS3 compatible
-        -1, # PS4 Dualshock Wireless
-        -1, # 8BitDo Pro 2 (D mode)
-        -1, # 8BitDo Pro 2 (X mode)
-        -1, # 8BitDo Pro 2 (S mode)
-        -1, # Logitech Gamepad F710
-    )
+    # Profile of the detected controller, and its position in PROFILES
+    profile = None
+    DETECTED_JOYSTICK_IDX = -1
     
+    # Specifications of each supported controller as tuples in the order of PROFILES. These
+    # are kept for programs written for earlier versions, and only include the built in profiles.
+    SUPPORTED_JOYSTICKS = PROFILES.column("name")
+    CONTROLLER_DISPLAY_NAMES = PROFILES.column("displayName")
+    AXES = PROFILES.column("axes")
+    BTNS = PROFILES.column("buttons")
+    HATS = PROFILES.column("hats")
     
-    # True hats
-    hatIdx = (
-        -1, # PS3 Dualshock
-         0, # Rock Candy USB Dongle
-         0, # Pi Hut USB Dongle
-         0, # Argos PS3 compatible
-         0, # PS4 Dualshock Wireless
-         0, # 8BitDo Pro 2 (D mode)
-         0, # 8BitDo Pro 2 (X mode)
-         0, # 8BitDo Pro 2 (S mode)
-        -1, # Logitech Gamepad F710
+    leftTriggerIdx = PROFILES.column("leftTrigger")
+    rightTriggerIdx = PROFILES.column("rightTrigger")
+    leftStickLRIdx = PROFILES.column("leftStickLR")
+    leftStickUDIdx = PROFILES.column("leftStickUD")
+    rightStickLRIdx = PROFILES.column("rightStickLR")
+    rightStickUDIdx = PROFILES.column("rightStickUD")
+    leftBtn1Idx = PROFILES.column("leftBtn1")
+    rightBtn1Idx = PROFILES.column("rightBtn1")
+    leftBtn2Idx = PROFILES.column("leftBtn2")
+    rightBtn2Idx = PROFILES.column("rightBtn2")
+    leftStickPressIdx = PROFILES.column("leftStickPress")
+    rightStickPressIdx = PROFILES.column("rightStickPress")
+    triangleXBtnIdx = PROFILES.column("triangleXBtn")
+    squareYBtnIdx = PROFILES.column("squareYBtn")
+    circleABtnIdx = PROFILES.column("circleABtn")
+    crossBBtnIdx = PROFILES.column("crossBBtn")
+    selectBtnIdx = PROFILES.column("selectBtn")
+    homeBtnIdx = PROFILES.column("homeBtn")
+    startBtnIdx = PROFILES.column("startBtn")
+    starBtnIdx = PROFILES.column("starBtn")
+    hatLeftIdx = PROFILES.column("hatLeft")
+    hatRightIdx = PROFILES.column("hatRight")
+    hatUpIdx = PROFILES.column("hatUp")
+    hatDownIdx = PROFILES.column("hatDown")
+    hatIdx = PROFILES.column("hat")
+
+    # Simple buttons, in display order. Each entry gives the name of the control in the profile,
+    # the text displayed on screen, the attribute holding the button state and the callback attribute.
+    BUTTON_CONTROLS = (
+        ("leftBtn1", "Left Trigger Button 1", "leftBtn1State", "leftBtn1Changed"),
+        ("rightBtn1", "Right Trigger Button 1", "rightBtn1State", "rightBtn1Changed"),
+        ("leftBtn2", "Left Trigger Button 2", "leftBtn2State", "leftBtn2Changed"),
+        ("rightBtn2", "Right Trigger Button 2", "rightBtn2State", "rightBtn2Changed"),
+        ("leftStickPress", "Left Stick Pressed", "leftStickPressedState", "leftStickPressChanged"),
+        ("rightStickPress", "Right Stick Pressed", "rightStickPressedState", "rightStickPressChanged"),
+        ("selectBtn", "Select Button", "selectBtnState", "selectBtnChanged"),
+        ("homeBtn", "Home Button", "homeBtnState", "homeBtnChanged"),
+        ("startBtn", "Start Button", "startBtnState", "startBtnChanged"),
+        ("starBtn", "Star Button", "starBtnState", "starBtnChanged"),
+        ("triangleXBtn", "Triangle Button", "triangleBtnState", "triangleBtnChanged"),
+        ("squareYBtn", "Square Button", "squareBtnState", "squareBtnChanged"),
+        ("circleABtn", "Circle Button", "circleBtnState", "circleBtnChanged"),
+        ("crossBBtn", "X-Cross Button", "crossXBtnState", "crossXBtnChanged"),
     )
-    
+
+    # Names used to refer to each control which has a callback function, e.g. when setting rate
+    # limits. These are the names of the callback function arguments without "Changed".
+    CONTROL_NAMES = ("leftStick", "rightStick", "leftTrigger", "rightTrigger", "hat") + tuple(
+        callbackName[:-len("Changed")] for controlName, btnName, stateName, callbackName in BUTTON_CONTROLS)
+
+    #Callback functions for the controls. Setting one once the controller has been detected
+    #updates the poll plan, so the control starts (or stops) being read.
+    leftTriggerChanged = _CallbackAttribute()
+    rightTriggerChanged = _CallbackAttribute()
+    leftStickChanged = _CallbackAttribute()
+    rightStickChanged = _CallbackAttribute()
+    hatChanged = _CallbackAttribute()
+    leftBtn1Changed = _CallbackAttribute()
+    rightBtn1Changed = _CallbackAttribute()
+    leftBtn2Changed = _CallbackAttribute()
+    rightBtn2Changed = _CallbackAttribute()
+    leftStickPressChanged = _CallbackAttribute()
+    rightStickPressChanged = _CallbackAttribute()
+    selectBtnChanged = _CallbackAttribute()
+    homeBtnChanged = _CallbackAttribute()
+    startBtnChanged = _CallbackAttribute()
+    starBtnChanged = _CallbackAttribute()
+    triangleBtnChanged = _CallbackAttribute()
+    squareBtnChanged = _CallbackAttribute()
+    circleBtnChanged = _CallbackAttribute()
+    crossXBtnChanged = _CallbackAttribute()
 
     #Properties holding program status or controlling behaviour
     initialised = False
     displayControllerOutput = True
     
+    #Flag indicating whether the status display was drawn on the last display update
+    _statusDisplayed = False
+    
     #Message text to be displayed in window which can be set from outside the class
     message = ""
     
@@ -529,6 +508,21 @@ class RobotController:
     squareBtnState = 0
     circleBtnState = 0
     crossXBtnState = 0
+    #States of the left, right, up and down buttons on controllers with hats presented as buttons
+    hatBtnStates = (0, 0, 0, 0)
+    
+    #The value of every axis of the controller, by axis index, read into the same array each tick.
+    #It supports the buffer protocol, so e.g. numpy.frombuffer(controller.axisValues) gives a view
+    #of the values without copying them. The values are before deadzones are applied, and only the
+    #axes which need reading (see buildPollPlan()) are updated. A new array is only created if a
+    #controller with a different number of axes is connected.
+    axisValues = None
+    
+    #Smoothing filters which can be set with setSmoothing(), by name
+    SMOOTHING_FILTERS = {"lowpass": LowPassFilter, "oneEuro": OneEuroFilter, "damped": CriticallyDampedFilter}
+    
+    #Number of progress reports passed to initStatus while waiting for a controller to be detected
+    DETECT_STEPS = 32
     
     def __init__(self, title, initStatus, leftTriggerChanged = None, rightTriggerChanged = None,
                  leftStickChanged = None, rightStickChanged = None,
@@ -538,7 +532,10 @@ class RobotController:
                  leftStickPressChanged = None, rightStickPressChanged = None,
                  selectBtnChanged = None, homeBtnChanged = None, startBtnChanged = None, starBtnChanged = None, triangleBtnChanged = None,
                  squareBtnChanged = None, circleBtnChanged = None, crossXBtnChanged = None,
-                 mouseDown = None, mouseUp = None):
+                 mouseDown = None, mouseUp = None, eventDriven = False,
+                 inputRate = 20, displayRate = 20, headless = False,
+                 inputThread = False, inputThreadCallbacks = False, backend = None, detectTimeout = 16,
+                 connectionChanged = None, joystick = None):
         
         #Storereferences to callback functions
         self.initStatus = initStatus
@@ -562,27 +559,138 @@ class RobotController:
         self.circleBtnChanged = circleBtnChanged
         self.crossXBtnChanged = crossXBtnChanged
         self.mouseDown = mouseDown
+        self.connectionChanged = connectionChanged
         self.mouseUp = mouseUp
+        self.eventDriven = eventDriven
+        if displayRate <= 0:
+            raise ValueError("Display rate must be greater than 0, not {}".format(displayRate))
+        self.inputRate = inputRate
+        self.displayRate = displayRate
+        self.headless = headless
+        self._quitRequested = False
+        self._deadzones = {}
+        self._rateLimits = {}
+        #Response curves and smoothing filters by control name. Sticks have a (left/right, up/down)
+        #pair, with None for an axis which has none. The dictionaries are replaced rather than
+        #changed in place, so the input thread never sees a partly updated pair.
+        self._curves = {}
+        self._smoothingFilters = {}
+        #Time of the last tick, for the smoothing filters
+        self._lastTickTime = None
+        self.inputThreadCallbacks = inputThreadCallbacks
+        self._inputThread = None
+        self._inputThreadError = None
+        self._stopInputThread = threading.Event()
+        #Held while the controls are read and while the controller is disconnected or reconnected, so
+        #a read never sees the control maps and poll plan part way through being reset or rebuilt.
+        #It is reentrant as the callbacks of controls returning to rest may run while it is held.
+        self._connectionLock = threading.RLock()
+        #Callbacks waiting to be called on the main thread, as (control, callback, args) tuples
+        self._callbackQueue = deque()
+        #How the callback function for each control is called, for controls not simply called inline
+        self._callbackPolicies = {}
+        self._workerPool = None
+        #Latency histograms of the callback functions when callback timing is enabled, keyed by control
+        self._callbackHistograms = None
+        self._displayCallbackStats = False
+        #Records the time taken by each part of each tick when loop timing is enabled
+        self._loopTimer = None
+        #Listeners waiting for control changes from the asyncio API, and the task servicing the controller
+        self._eventListeners = []
+        self._asyncTask = None
+        #Records every change of every control to a log file while recording
+        self._recorder = None
+        #True when every change of every control must be passed to _callback(), whether or not the
+        #control has a callback function, for the event listeners or recorder
+        self._reportAllChanges = False
+        #Calls a safe stop function when input reports stop arriving, if enabled
+        self._watchdog = None
         
-        #Look for supported game controller
-        controllerFound = False
-        lastCount = 0
-        for retries in range(1, 33):
-            #Initialise pygame
-            pygame.init()
-
-            # Initialize the joysticks
-            pygame.joystick.init()
+        if self.headless:
+            #No window will be created, so pygame must not try to open a real display
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            self.displayControllerOutput = False
+        
+        #Whether the controller is connected, and how long it took for the controls to be read again
+        #after the last time it was reconnected
+        self.connected = False
+        self.reconnectLatency = None
+        self._disconnectTime = None
+        self._reconnectTime = None
+        #The time.monotonic() time of the last input report from the controller
+        self.lastInputTime = None
+        
+        #Where the joysticks come from
+        if backend is None:
+            backend = PygameBackend()
+        self.backend = backend
+        
+        #Look for supported game controller. Pygame is only initialised once, then each time a joystick
+        #is connected the joysticks are examined again, until the detection time runs out.
+        self.backend.init()
+        if joystick is None:
+            detected = self.detectControllers(self.backend, self.initStatus, 1, detectTimeout)
+        else:
+            #Use the joystick passed in rather than looking for one
+            joystick.init()
+            specs = (joystick.get_name(), joystick.get_numaxes(), joystick.get_numbuttons(), joystick.get_numhats())
+            profile = self.PROFILES.match(*specs)
+            if profile is None:
+                raise ValueError( self.PROFILES.explainMismatch(*specs) )
+            detected = [(joystick, profile)]
+            self.initStatus(0)
+        
+        #Finished trying to detect game controller             
+        if not detected :
+            #Send status failed to callback function
+            self.backend.quit()
+            self.initStatus(-1)
+        else:
+            #Complete class set up
+            self.controller, self.profile = detected[0]
+            self.DETECTED_JOYSTICK_IDX = self.PROFILES.index(self.profile)
+            
+            # Used to manage how fast the controller is read and the screen updates
+            self.clock = pygame.time.Clock()
+            self._displaySchedule = _DisplaySchedule()
+            self._setUpDisplay(title)
+            
+            # Work out how to read each control on this controller, and which need reading each tick
+            self._buildControlMaps()
+            self.buildPollPlan()
             
+            #Set initialised flag to indicate everything is ready
+            self.lastInputTime = time.monotonic()
+            self.connected = True
+            self.initialised = True
+            
+            if inputThread:
+                self._startInputThread()
+    
+    
+    @classmethod
+    def detectControllers(cls, backend, initStatus, count = 1, detectTimeout = 16):
+        """Waits for supported game controllers to be connected, returning a list of (joystick, profile)
+           tuples for the first count supported controllers found. The list is empty if not enough
+           were found within detectTimeout seconds. The backend must already be initialised.
+           initStatus is passed the number of each progress report while waiting, and 0 once all the
+           controllers have been found.
+        """
+        detected = []
+        lastCount = 0
+        retries = 0
+        detectStart = time.monotonic()
+        while True:
             # Get count of joysticks
-            joystick_count = pygame.joystick.get_count()
+            joystick_count = backend.getCount()
             
             #Examine joysticks if number changed
             if lastCount != joystick_count :
                 lastCount = joystick_count
+                detected = []
 
                 for i in range(joystick_count):
-                    joystick = pygame.joystick.Joystick(i)
+                    joystick = backend.getJoystick(i)
                     joystick.init()
 
                     # Get the name from the OS for the controller/joystick
@@ -590,62 +698,52 @@ class RobotController:
                     print("Joystick {} detected as ".format(i) + name )
                     
                     #Determine whether detected joystick is a supported model type 
-                    for j in range(0, len(self.SUPPORTED_JOYSTICKS) ) :
-                        #Looking for the supporter name text as a substring of the detected full name
-                        if self.SUPPORTED_JOYSTICKS[j] in name:
-                            self.DETECTED_JOYSTICK_IDX = j
+                    axes = joystick.get_numaxes()
+                    btns = joystick.get_numbuttons()
+                    hats = joystick.get_numhats()
+                    profile = cls.PROFILES.match(name, axes, btns, hats)
+                    if profile is not None :
+                        detected.append( (joystick, profile) )
+                        if len(detected) == count:
                             break
-                                    
-                    if self.DETECTED_JOYSTICK_IDX > -1 :
-                        #Check the controller matches the expected specifications
-                        axes = joystick.get_numaxes()
-                        if axes == self.AXES[self.DETECTED_JOYSTICK_IDX] :
-                            hats = joystick.get_numhats()
-                            if hats == self.HATS[self.DETECTED_JOYSTICK_IDX] :
-                                btns = joystick.get_numbuttons()
-                                if btns >= self.BTNS[self.DETECTED_JOYSTICK_IDX] :
-                                    #Set up this controller
-                                    self.controller = joystick
-                                    controllerFound = True
-                                    
-                                    #Send status success to callback function
-                                    self.initStatus(0)
-                                    break
-                                else:
-                                    print("Joystick has {} buttons. Expected at least {}.".format( btns,self.BTNS[self.DETECTED_JOYSTICK_IDX] ) )
-                            else:
-                                print("Joystick has {} hats. Expected {}.".format( hats,self.HATS[self.DETECTED_JOYSTICK_IDX] ) )
-                        else:
-                            print("Joystick has {} axes. Expected {}.".format( axes,self.AXES[self.DETECTED_JOYSTICK_IDX] ) )
                     else:
-                        print("Unsupported joystick {} detected as ".format(i) + name )
-                        
-            #Retry if controller was not detected
-            if controllerFound == False :
-                #Ready to try again
-                self.initStatus(retries)
-                self.DETECTED_JOYSTICK_IDX = -1
-                #Quit pygame as it needs restarting to detect newly paired joysticks
-                pygame.quit()
-            else:
-                break
-        
-        #Finished trying to detect game controller             
-        if controllerFound == False :
-            #Send status failed to callback function
-            self.initStatus(-1)
-        else:
-            #Complete class set up
+                        print( cls.PROFILES.explainMismatch(name, axes, btns, hats) )
             
+            if len(detected) == count:
+                #Send status success to callback function
+                initStatus(0)
+                return detected
+            if retries == cls.DETECT_STEPS:
+                return []
+            
+            #Wait for a joystick to be connected until the next progress report is due
+            nextReport = detectStart + (retries + 1) * detectTimeout / cls.DETECT_STEPS
+            remaining = nextReport - time.monotonic()
+            if remaining > 0:
+                backend.waitForJoystick(remaining)
+            if time.monotonic() >= nextReport:
+                retries += 1
+                initStatus(retries)
+    
+    
+    def _setUpDisplay(self, title):
+        """Internal function which creates the window showing the status display, or in headless
+           mode makes signals request a quit instead
+        """
+        if self.headless:
+            self.screen = None
+            self.textPrint = None
+            self._installQuitSignalHandlers()
+        else:
+            #Only start the font engine when there is a window to show text in
+            pygame.font.init()
+                
             # Set the width and height of the screen [width,height]
             size = [400, 500]
             self.screen = pygame.display.set_mode(size)
 
             pygame.display.set_caption(title)
 
-            # Used to manage how fast the screen updates
-            self.clock = pygame.time.Clock()
-
             # Create text output object 
             self.textPrint = TextPrint(self.screen)
 
@@ -653,9 +751,6 @@ class RobotController:
     
             # Update the screen 
             pygame.display.flip()
-            
-            #Set initialised flag to indicate everything is ready
-            self.initialised = True
     
     
     def controllerStatus(self):
@@ -663,251 +758,1772 @@ class RobotController:
            Displays the status of all controls on screen and returns a flag indicating whether to quit.
            
            This function should be called in a loop from your application as often as your code can. It
-           will automatically regulate the frequency it is called using the pygame clock.
+           will automatically regulate the frequency it is called using the pygame clock, limiting it to
+           the inputRate. The window is only redrawn at the displayRate.
         """
+        keepRunning = self._serviceController()
         
-        #Initialise screen display of controller status
-        if self.displayControllerOutput == True:
-            self.textPrint.reset()
-            self.textPrint.print("Controller: {}".format( self.CONTROLLER_DISPLAY_NAMES[self.DETECTED_JOYSTICK_IDX] ) )
-            self.textPrint.indent()
+        # Limit the rate the controller is read at
+        self.clock.tick(self.inputRate)
         
-        #Process analogue sticks
-        if (self.leftStickLRIdx[self.DETECTED_JOYSTICK_IDX] != -1
-        and self.leftStickUDIdx[self.DETECTED_JOYSTICK_IDX] != -1 ):
-            #Get stick postitions
-            leftStickLR = self.controller.get_axis( self.leftStickLRIdx[self.DETECTED_JOYSTICK_IDX] )
-            leftStickUD = self.controller.get_axis( self.leftStickUDIdx[self.DETECTED_JOYSTICK_IDX] )
-
-            if self.displayControllerOutput == True:
-                #Display stick position on screen
-                self.textPrint.print("Left Stick:" )
-                self.textPrint.indent()
-                self.textPrint.print("Left/Right: {}".format( leftStickLR ) )
-                self.textPrint.print("Up/Down: {}".format( leftStickUD ) )
-                self.textPrint.unindent()
-            #Call the callback function if defined and stick position has changed since last called
-            if (self.leftStickChanged is not None
-            and ( self.leftStickLR != leftStickLR or self.leftStickUD != leftStickUD ) ):
-                self.leftStickLR = leftStickLR
-                self.leftStickUD = leftStickUD
-                self.leftStickChanged( self.leftStickLR, self.leftStickUD )
-                
-        if (self.rightStickLRIdx[self.DETECTED_JOYSTICK_IDX] != -1
-        and self.rightStickUDIdx[self.DETECTED_JOYSTICK_IDX] != -1 ):
-            #Get stick postitions
-            rightStickLR = self.controller.get_axis( self.rightStickLRIdx[self.DETECTED_JOYSTICK_IDX] )
-            rightStickUD = self.controller.get_axis( self.rightStickUDIdx[self.DETECTED_JOYSTICK_IDX] )
-            if self.displayControllerOutput == True:
-                #Display stick position on screen
-                self.textPrint.print("Right Stick:" )
-                self.textPrint.indent()
-                self.textPrint.print("Left/Right: {}".format( rightStickLR ) )
-                self.textPrint.print("Up/Down: {}".format( rightStickUD ) )
-                self.textPrint.unindent()
-            #Call the callback function if defined and stick position has changed since last called
-            if (self.rightStickChanged is not None
-            and ( self.rightStickLR != rightStickLR or self.rightStickUD != rightStickUD ) ):
-                self.rightStickLR = rightStickLR
-                self.rightStickUD = rightStickUD
-                self.rightStickChanged( self.rightStickLR, self.rightStickUD )
-                
-        #Process analogue triggers
-        if self.displayControllerOutput == True:
-            self.textPrint.print("Front Analogue Triggers:" )
-            self.textPrint.indent()
-        if self.leftTriggerIdx[self.DETECTED_JOYSTICK_IDX] != -1 :
-            #Get trigger value
-            leftTrigger = self.controller.get_axis( self.leftTriggerIdx[self.DETECTED_JOYSTICK_IDX] )
-            #Analogue triggers return zero until first used, even through their rest status is -1
-            #so we need to detect the first time they return a non-zero value to activate them and
-            #start returning their value to the callback function.
-            if self.leftTriggerActivated == False :
-                if leftTrigger != 0.0 :
-                    self.leftTriggerActivated = True
-            if self.displayControllerOutput == True:
-                #Display value on screen
-                self.textPrint.print("Left Trigger: {}".format( leftTrigger ) )
-            #Call the callback function if defined and trigger position has changed since last called
-            if (self.leftTriggerChanged is not None
-            and self.leftTriggerActivated == True
-            and self.leftTriggerPos != leftTrigger ):
-                self.leftTriggerPos = leftTrigger
-                self.leftTriggerChanged( self.leftTriggerPos )
-        elif self.displayControllerOutput == True:
-            self.textPrint.print("No analogue Left Trigger on this controller" )
-            
-        if self.rightTriggerIdx[self.DETECTED_JOYSTICK_IDX] != -1:
-            #Get trigger value
-            rightTrigger = self.controller.get_axis( self.rightTriggerIdx[self.DETECTED_JOYSTICK_IDX] )
-            #Analogue triggers return zero until first used, even through their rest status is -1
-            #so we need to detect the first time they return a non-zero value to activate them and
-            #start returning their value to the callback function.
-            if self.rightTriggerActivated == False :
-                if rightTrigger != 0.0 :
-                    self.rightTriggerActivated = True
-            if self.displayControllerOutput == True:
-                #Display value on screen
-                self.textPrint.print("Right Trigger: {}".format( rightTrigger ) )
-                self.textPrint.unindent()
-            #Call the callback function if defined and trigger position has changed since last called
-            if (self.rightTriggerChanged is not None
-            and self.rightTriggerActivated == True
-            and self.rightTriggerPos != rightTrigger ):
-                self.rightTriggerPos = rightTrigger
-                self.rightTriggerChanged( self.rightTriggerPos )
-        elif self.displayControllerOutput == True:
-            self.textPrint.print("No analogue Right Trigger on this controller" )
-            self.textPrint.unindent()
+        if self._loopTimer is not None:
+            self._loopTimer.phase(stats.SLEEP_PHASE)
+            self._loopTimer.endTick()
         
-        #Process Hats
-        if self.hatIdx[self.DETECTED_JOYSTICK_IDX] != -1:
-            hatState = self.controller.get_hat( self.hatIdx[self.DETECTED_JOYSTICK_IDX] )
-            hatLR = hatState[0]
-            hatUD = hatState[1]
+        return keepRunning
+    
+    
+    def _serviceController(self):
+        """Internal function which does all the work of controllerStatus() without waiting. Returns
+           False if the application should quit.
+        """
+        timer = self._loopTimer
+        if timer is not None:
+            timer.startTick()
+        
+        if self._inputThread is None:
+            self.backend.update()
+        
+        #Process the event queue, checking for quit and (in event driven mode) controller events
+        keepRunning = self._processEvents()
+        if timer is not None:
+            timer.phase(stats.EVENTS_PHASE)
+        
+        self._serviceInput()
+        if timer is not None:
+            timer.phase(stats.INPUT_PHASE)
+        
+        #Redraw the window only when it is due at the display rate
+        if self.headless == False and self._displaySchedule.due(self.displayRate):
             if self.displayControllerOutput == True:
-                self.textPrint.print("4-way hat:" )
-                self.textPrint.indent()
-                self.textPrint.print("Left/Right: {}".format( hatLR ) )
-                self.textPrint.print("Up/Down: {}".format( hatUD ) )
-                self.textPrint.unindent()
-        elif (self.hatUpIdx[self.DETECTED_JOYSTICK_IDX] != -1
-        and   self.hatDownIdx[self.DETECTED_JOYSTICK_IDX] != -1
-        and   self.hatLeftIdx[self.DETECTED_JOYSTICK_IDX] != -1
-        and   self.hatRightIdx[self.DETECTED_JOYSTICK_IDX] != -1 ):
-            #Process hat buttons where detected as separate buttons
-            hatUpBtn = self.controller.get_button( self.hatUpIdx[self.DETECTED_JOYSTICK_IDX] )
-            hatDownBtn = self.controller.get_button( self.hatDownIdx[self.DETECTED_JOYSTICK_IDX] )
-            if hatUpBtn == 1 :
-                hatUD = 1
-            elif hatDownBtn == 1 :
-                hatUD = -1
-            else:
-                hatUD = 0
-            hatLeftBtn = self.controller.get_button( self.hatLeftIdx[self.DETECTED_JOYSTICK_IDX] )
-            hatRightBtn = self.controller.get_button( self.hatRightIdx[self.DETECTED_JOYSTICK_IDX] )
-            if hatLeftBtn == 1 :
-                hatLR = -1
-            elif hatRightBtn == 1 :
-                hatLR = 1
+                self._displayStatus()
+                if timer is not None:
+                    timer.phase(stats.RENDER_PHASE)
+                # Update only the parts of the screen which changed
+                pygame.display.update( self.textPrint.finishUpdate() )
             else:
-                hatLR = 0
-            if self.displayControllerOutput == True:
-                self.textPrint.print("4-way hat buttons:" )
-                self.textPrint.indent()
-                self.textPrint.print("Left: {}".format( hatLeftBtn ) )
-                self.textPrint.print("Right: {}".format( hatRightBtn ) )
-                self.textPrint.print("Up: {}".format( hatUpBtn ) )
-                self.textPrint.print("Down: {}".format( hatDownBtn ) )
-                self.textPrint.unindent()
-                self.textPrint.print("Converted to Hat values:" )
-                self.textPrint.indent()
-                self.textPrint.print("Left/Right: {}".format( hatLR ) )
-                self.textPrint.print("Up/Down: {}".format( hatUD ) )
-                self.textPrint.unindent()
-                
-        #Update Hat state if any button states changed
-        if (self.hatChanged is not None
-        and (self.hatUDState != hatUD or self.hatLRState != hatLR) ):
-            self.hatUDState = hatUD
-            self.hatLRState = hatLR
-            self.hatChanged( self.hatLRState, self.hatUDState )
+                # Update the screen 
+                pygame.display.flip()
+            if timer is not None:
+                timer.phase(stats.FLIP_PHASE)
+            self._statusDisplayed = self.displayControllerOutput
         
-        #Process buttons
-        if self.displayControllerOutput == True:
-            self.textPrint.print("Simple buttons:" )
-            self.textPrint.indent()
-
-        self.leftBtn1State = self.processButton(
-            self.leftBtn1Idx[self.DETECTED_JOYSTICK_IDX],
-            "Left Trigger Button 1", self.leftBtn1State, self.leftBtn1Changed)
-        self.rightBtn1State = self.processButton(
-            self.rightBtn1Idx[self.DETECTED_JOYSTICK_IDX],
-            "Right Trigger Button 1", self.rightBtn1State, self.rightBtn1Changed)
-        if self.leftTriggerIdx[self.DETECTED_JOYSTICK_IDX] == -1 :
-            #No analogue trigger so handle as simple button
-            self.leftBtn2State = self.processButton(
-                self.leftBtn2Idx[self.DETECTED_JOYSTICK_IDX],
-                "Left Trigger Button 2", self.leftBtn2State, self.leftBtn2Changed)
-        if self.rightTriggerIdx[self.DETECTED_JOYSTICK_IDX] == -1 :
-            #No analogue trigger so handle as simple button
-            self.rightBtn2State = self.processButton(
-                self.rightBtn2Idx[self.DETECTED_JOYSTICK_IDX],
-                "Right Trigger Button 2", self.rightBtn2State, self.rightBtn2Changed)
-        
-        self.leftStickPressedState = self.processButton(
-            self.leftStickPressIdx[self.DETECTED_JOYSTICK_IDX],
-            "Left Stick Pressed", self.leftStickPressedState, self.leftStickPressChanged)
-        self.rightStickPressedState = self.processButton(
-            self.rightStickPressIdx[self.DETECTED_JOYSTICK_IDX],
-            "Right Stick Pressed", self.rightStickPressedState, self.rightStickPressChanged)
-
-        self.selectBtnState = self.processButton(
-            self.selectBtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "Select Button", self.selectBtnState, self.selectBtnChanged)
-        self.homeBtnState = self.processButton(
-            self.homeBtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "Home Button", self.homeBtnState, self.homeBtnChanged)
-        self.startBtnState = self.processButton(
-            self.startBtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "Start Button", self.startBtnState, self.startBtnChanged)
-        self.starBtnState = self.processButton(
-            self.starBtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "Star Button", self.starBtnState, self.starBtnChanged)
-
-        
-        self.triangleBtnState = self.processButton(
-            self.triangleXBtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "Triangle Button", self.triangleBtnState, self.triangleBtnChanged)
-        self.squareBtnState = self.processButton(
-            self.squareYBtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "Square Button", self.squareBtnState, self.squareBtnChanged)
-        self.circleBtnState = self.processButton(
-            self.circleABtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "Circle Button", self.circleBtnState, self.circleBtnChanged)
-        self.crossXBtnState = self.processButton(
-            self.crossBBtnIdx[self.DETECTED_JOYSTICK_IDX],
-            "X-Cross Button", self.crossXBtnState, self.crossXBtnChanged)
-
-        if self.displayControllerOutput == True:
-            #Display any message text set outside the class
-            self.textPrint.unindent()
-            self.textPrint.print("")
-            self.textPrint.print( self.message )
+        self._raiseThreadErrors()
         
-        # Limit to 20 frames per second
-        self.clock.tick(20)
+        if self._quitRequested:
+            keepRunning = False
         
-        # Update the screen 
-        pygame.display.flip()
-
-        # Check for quit event
-        keepRunning = True
-        for event in pygame.event.get(): # User did something
-            if ( (event.type == pygame.MOUSEBUTTONDOWN)
-            and (self.mouseDown is not None) ):
-                self.mouseDown( pygame.mouse.get_pos(), event.button )
-            elif event.type == pygame.QUIT: # If user clicked close
-                keepRunning = False # Flag that we are done so we exit this loop
+        if keepRunning == False:
+            self._shutdown()
         
         return keepRunning
     
-
-    def processButton(self, btnIdx, btnName, lastState, btnCallback):
-        """Internal function to handle any button press"""
-        if btnIdx != -1:
-            #Get button value
-            btnState = self.controller.get_button( btnIdx )
-            if self.displayControllerOutput == True:
-                #Display value on screen
-                self.textPrint.print(btnName + ": {}".format( btnState ) )
-            #Call the callback function if defined and button state has changed since last called
-            if (btnCallback is not None
-            and lastState != btnState ):
-                lastState = btnState
-                btnCallback( btnState )
-        return lastState
     
+    def _serviceInput(self):
+        """Internal function which reads the controls (unless the input thread is reading them) and
+           calls the callback functions of those which changed, after the event queue has been processed
+        """
+        if self._inputThread is not None:
+            #The controller is being read on the input thread
+            if self._inputThreadError is not None:
+                #Pass on errors from callback functions run on the input thread
+                raise self._inputThreadError
+            if self.inputThreadCallbacks == False:
+                self._runQueuedCallbacks()
+                if self._rateLimits:
+                    self._flushRateLimits()
+        elif self.connected:
+            if self.eventDriven == False or self._syncPending == True:
+                #Read every control on the controller. Reading can ask for another read next tick,
+                #e.g. while smoothing filters settle.
+                self._syncPending = False
+                self._pollControls()
+                if self._reconnectTime is not None:
+                    self._reportReconnected()
+            
+            if self._rateLimits:
+                #Pass on the latest values of rate limited controls which are now due
+                self._flushRateLimits()
+            if self._smoothingFilters:
+                self._lastTickTime = time.monotonic()
+    
+    
+    def _raiseThreadErrors(self):
+        """Internal function passing on errors from callback functions run on worker threads or the
+           watchdog thread
+        """
+        if self._workerPool is not None and self._workerPool.error is not None:
+            raise self._workerPool.error
+        if self._watchdog is not None and self._watchdog.error is not None:
+            raise self._watchdog.error
+    
+    
+    def _shutdown(self):
+        """Internal function which stops the background threads and recording when quitting"""
+        self.stopInputThread()
+        self.stopRecording()
+        if self._workerPool is not None:
+            self._workerPool.shutdown()
+        if self._watchdog is not None:
+            self._watchdog.stop()
+    
+    
+    def requestQuit(self):
+        """Requests the application to quit. The next call to controllerStatus() will return False.
+           This can be called from your callback functions, and is the way to quit in headless mode
+           where there is no window to close.
+        """
+        self._quitRequested = True
+    
+    
+    def _installQuitSignalHandlers(self):
+        """Internal function which makes SIGINT and SIGTERM request a quit in headless mode, so the
+           main loop can exit cleanly. A second signal is handled by the previously installed handler.
+        """
+        _installQuitSignalHandlers(self.requestQuit)
+    
+    
+    def buildPollPlan(self):
+        """Works out which controls need to be read each time controllerStatus() is called. Only
+           controls present on the detected controller which have a callback function are read,
+           or every control on the controller when the status display is shown.
+           
+           This is called when the controller is detected, and again whenever one of the callback
+           functions is changed after that.
+        """
+        #The axes of the analogue controls are read together, then processed only if any changed
+        callbackAxes = []
+        callbackAxisPlan = []
+        displayAxes = []
+        displayAxisPlan = []
+        for present, callback, axes, process in (
+            (self._hasLeftStick, self.leftStickChanged, self._leftStickAxes, self._processLeftStick),
+            (self._hasRightStick, self.rightStickChanged, self._rightStickAxes, self._processRightStick),
+            (self._hasLeftTrigger, self.leftTriggerChanged, (self._leftTriggerAxis,), self._processLeftTrigger),
+            (self._hasRightTrigger, self.rightTriggerChanged, (self._rightTriggerAxis,), self._processRightTrigger) ):
+            if present:
+                displayAxes.extend(axes)
+                displayAxisPlan.append(process)
+                if callback is not None:
+                    callbackAxes.extend(axes)
+                    callbackAxisPlan.append(process)
+        callbackPlan = [self._axisPoller(callbackAxes, callbackAxisPlan)] if callbackAxisPlan else []
+        displayPlan = [self._axisPoller(displayAxes, displayAxisPlan)] if displayAxisPlan else []
+        self._forceAxisProcessing()
+        
+        if self._hasHat or self._hasHatButtons:
+            displayPlan.append(self._processHat)
+            if self.hatChanged is not None:
+                callbackPlan.append(self._processHat)
+        
+        #Button entries are shared between both plans, so they hold the same last known state
+        callbackButtons = [button for button in self._buttons if button[2] is not None]
+        if callbackButtons:
+            callbackPlan.append( lambda: self._processButtons(callbackButtons) )
+        if self._buttons:
+            displayPlan.append( lambda: self._processButtons(self._buttons) )
+        
+        self._callbackPollPlan = callbackPlan
+        self._displayPollPlan = displayPlan
+    
+    
+    def _callbackChanged(self, callbackName):
+        """Internal function called when a callback function attribute is set. Once the controller
+           has been detected the button entries and poll plan are updated to use the new function.
+        """
+        if not self.initialised:
+            #The callback functions are picked up when the controller is detected
+            return
+        controlName = callbackName[:-len("Changed")]
+        for button in self._buttons:
+            if button[5] == controlName:
+                button[2] = self.__dict__[callbackName]
+        self.buildPollPlan()
+    
+    
+    def _axisPoller(self, axes, processes):
+        """Internal function returning a function for the poll plan which reads the axes into
+           axisValues, then calls the processes (the functions processing the analogue controls)
+           only if any of the axes changed since they were last read
+        """
+        axes = tuple( sorted( set(axes) ) )
+        def pollAxes():
+            values = self.axisValues
+            getAxis = self.controller.get_axis
+            changed = self._axisProcessingDue
+            for axis in axes:
+                value = getAxis(axis)
+                if value != values[axis]:
+                    values[axis] = value
+                    changed = True
+            if changed:
+                self._axisProcessingDue = False
+                for process in processes:
+                    process()
+        return pollAxes
+    
+    
+    def _axisReader(self, axes, process):
+        """Internal function returning the event driven mode handler which reads the axes of one
+           analogue control into axisValues and processes the control
+        """
+        def readAxes():
+            values = self.axisValues
+            getAxis = self.controller.get_axis
+            for axis in axes:
+                values[axis] = getAxis(axis)
+            process()
+        return readAxes
+    
+    
+    def _forceAxisProcessing(self):
+        """Internal function which makes the next poll process the analogue controls even if their
+           axes have not changed, e.g. because the way they are processed has changed. In event
+           driven mode the controls are read on the next tick.
+        """
+        self._axisProcessingDue = True
+        self._syncPending = True
+    
+    
+    def setDeadzone(self, control, radial = 0.0, axial = 0.0, minChange = 0.0):
+        """Sets the deadzones and minimum change filtering for an analogue stick or trigger. Readings
+           inside a deadzone are passed to the callback function as the rest position, and changes
+           smaller than minChange are not passed on at all, so a stick at rest with a noisy reading
+           does not keep calling its callback function. See the Deadzone class for details.
+           
+           Args:
+               control: One of "leftStick", "rightStick", "leftTrigger" or "rightTrigger"
+               
+               radial: Radius of the deadzone around the centre of a stick
+               
+               axial: Width of the deadzone either side of 0 on each stick axis, or above the
+                   rest position of a trigger
+               
+               minChange: Smallest change in value which will be passed to the callback function
+           
+           Set all the arguments to 0 to remove the filtering for the control.
+        """
+        if control not in ("leftStick", "rightStick", "leftTrigger", "rightTrigger"):
+            raise ValueError("Deadzones can only be set for analogue sticks and triggers, not {}".format(control))
+        if radial == 0.0 and axial == 0.0 and minChange == 0.0:
+            self._deadzones.pop(control, None)
+        else:
+            self._deadzones[control] = Deadzone(radial, axial, minChange)
+        self._forceAxisProcessing()
+    
+    
+    def setResponseCurve(self, control, curve):
+        """Sets the response curve shaping the values of an analogue stick or trigger before they are
+           passed to its callback function, e.g. to give finer control near the centre of a stick or
+           to limit the speed of a robot. Curves can be swapped at any time, e.g. from a button
+           callback function to switch between slow and turbo modes, and the shaped values are
+           passed on straight away. Curves are applied before deadzones, so deadzones and minChange
+           are in terms of the shaped values.
+           
+           Args:
+               control: "leftStick" or "rightStick" to shape both axes of a stick, one axis of a stick
+                   (e.g. "leftStickLR" or "leftStickUD"), "leftTrigger" or "rightTrigger"
+               
+               curve: A ResponseCurve, or a function taking a value from -1 to 1 and returning the
+                   shaped value, which is compiled into a ResponseCurve. None removes the curve.
+                   For triggers the curve shapes how far the trigger is pressed (see
+                   ResponseCurve.forTrigger()).
+        """
+        if curve is not None and not isinstance(curve, ResponseCurve):
+            curve = ResponseCurve(curve)
+        if control in ("leftTrigger", "rightTrigger") and curve is not None:
+            curve = curve.forTrigger()
+        self._curves = self._updateAxisSettings(self._curves, control, lambda: curve, "Response curves")
+        self._forceAxisProcessing()
+    
+    
+    def setSmoothing(self, control, filter = None, **parameters):
+        """Smooths the values of an analogue stick or trigger before they are passed to its callback
+           function, e.g. so jitter from a stick held still does not make servos buzz. The filters
+           run as the controller is read, taking the time between ticks from the clock, so they
+           smooth the same whatever the input rate is. While a filter is catching up with the
+           stick it is processed every tick, and it stops calling the callback function once it
+           settles on the stick position. Filters are applied before response curves and deadzones.
+           
+           Args:
+               control: "leftStick" or "rightStick" to smooth both axes of a stick, one axis of a
+                   stick (e.g. "leftStickLR" or "leftStickUD"), "leftTrigger" or "rightTrigger"
+               
+               filter: One of
+                   "lowpass": Exponential moving average (LowPassFilter)
+                   "oneEuro": Smooths heavily when still and lightly when moving fast (OneEuroFilter)
+                   "damped": Critically damped spring, without overshoot (CriticallyDampedFilter)
+                   None: Removes the smoothing
+               
+               parameters: Arguments for the filter class, e.g. timeConstant for "lowpass"
+        """
+        if filter is None:
+            makeFilter = lambda: None
+        elif filter in self.SMOOTHING_FILTERS:
+            filterClass = self.SMOOTHING_FILTERS[filter]
+            #Check the parameters now rather than on first use
+            filterClass(**parameters)
+            makeFilter = lambda: filterClass(**parameters)
+        else:
+            raise ValueError("Unknown smoothing filter {}".format(filter))
+        self._smoothingFilters = self._updateAxisSettings(self._smoothingFilters, control, makeFilter, "Smoothing")
+        self._forceAxisProcessing()
+    
+    
+    @staticmethod
+    def _updateAxisSettings(settings, control, makeSetting, settingName):
+        """Internal function returning a copy of a dictionary of response curves or smoothing filters
+           with the setting for a control changed. The control is a stick, one axis of a stick
+           (e.g. "leftStickLR") or a trigger. makeSetting is called for each axis to get its curve
+           or filter, and returns None to remove the setting.
+        """
+        settings = dict(settings)
+        if control in ("leftTrigger", "rightTrigger"):
+            setting = makeSetting()
+            if setting is None:
+                settings.pop(control, None)
+            else:
+                settings[control] = setting
+            return settings
+        if control in ("leftStick", "rightStick"):
+            stick = control
+            pair = [makeSetting(), makeSetting()]
+        elif control[:-2] in ("leftStick", "rightStick") and control[-2:] in ("LR", "UD"):
+            stick = control[:-2]
+            pair = list( settings.get(stick, (None, None)) )
+            pair[0 if control[-2:] == "LR" else 1] = makeSetting()
+        else:
+            raise ValueError("{} can only be set for analogue sticks and triggers, not {}".format(settingName, control))
+        if pair == [None, None]:
+            settings.pop(stick, None)
+        else:
+            settings[stick] = tuple(pair)
+        return settings
+    
+    
+    def _smoothingStep(self):
+        """Internal function returning the time in seconds since the last tick, for the smoothing filters"""
+        if self._lastTickTime is None:
+            return 0.0
+        return time.monotonic() - self._lastTickTime
+    
+    
+    def getSuppressedCounts(self):
+        """Returns a dictionary giving the number of changed readings of each analogue stick or trigger
+           which were not passed to the callback function because of its deadzone settings.
+        """
+        return { control: deadzone.suppressed for control, deadzone in self._deadzones.items() }
+    
+    
+    def setRateLimit(self, control, maxRate):
+        """Limits how many times per second the callback function for a control is called. When the
+           control changes faster than this, the callback is passed the latest value each time it is
+           due, and the final value is always passed on once the callback is due again. Use this to
+           stop slow callback functions (e.g. ones updating hardware) being called more often than
+           they can keep up with. Changing the rate never loses the final value either, as a value
+           still waiting when the limit is changed or removed is passed on straight away.
+           
+           Args:
+               control: The name of the control (one of CONTROL_NAMES, e.g. "leftStick", "hat"
+                   or "crossXBtn")
+               
+               maxRate: Maximum number of calls per second, or None to remove the limit
+        """
+        if control not in self.CONTROL_NAMES:
+            raise ValueError("Unknown control {}".format(control))
+        #The limits are replaced rather than changed in place, as the input thread may be looping
+        #over them while this is called
+        rateLimits = dict(self._rateLimits)
+        if maxRate is None:
+            oldLimiter = rateLimits.pop(control, None)
+        else:
+            oldLimiter = rateLimits.get(control)
+            rateLimits[control] = RateLimiter(maxRate)
+        self._rateLimits = rateLimits
+        if oldLimiter is not None:
+            #Pass on any value waiting in the old limiter, e.g. a stick returning to the centre
+            oldLimiter.flushPending( time.monotonic() )
+    
+    
+    def getCoalescedCounts(self):
+        """Returns a dictionary giving the number of values of each rate limited control which
+           were replaced by a later value before the callback function was due.
+        """
+        return { control: limiter.coalesced for control, limiter in self._rateLimits.items() }
+    
+    
+    def setCallbackPolicy(self, control, policy = "inline", budget = None):
+        """Sets how the callback function for a control is called, so slow callback functions
+           (e.g. ones which sleep or wait for hardware) cannot stop the controller being read.
+           
+           Args:
+               control: The name of the control (one of CONTROL_NAMES)
+               
+               policy: One of
+                   "inline": Called straight away when the control changes (the default)
+                   "worker": Called on a worker thread. Every change is passed on, one call at a
+                       time in the order the changes happened.
+                   "latest": Called on a worker thread. A change still waiting when the control
+                       changes again is dropped, so the callback is always passed the latest value.
+               
+               budget: The time in seconds a call is expected to take at most. Calls taking longer
+                   are reported on the console and counted by getOverrunCounts().
+           
+           Callback functions called on worker threads run at the same time as your main loop and
+           the callbacks for other controls, so must be careful when sharing data with them.
+        """
+        if control not in self.CONTROL_NAMES:
+            raise ValueError("Unknown control {}".format(control))
+        if policy == "inline":
+            if budget is None and self._callbackHistograms is None:
+                self._callbackPolicies.pop(control, None)
+            else:
+                self._callbackPolicies[control] = InlineDispatch(budget, self._reportOverrun)
+        elif policy in ("worker", "latest"):
+            if self._workerPool is None:
+                self._workerPool = WorkerPool()
+            self._callbackPolicies[control] = WorkerDispatch(self._workerPool, policy == "latest",
+                                                             budget, self._reportOverrun)
+        else:
+            raise ValueError("Unknown callback policy {}".format(policy))
+        if self._callbackHistograms is not None:
+            self._timeCallback(control)
+    
+    
+    def getOverrunCounts(self):
+        """Returns a dictionary giving the number of calls of the callback function for each control
+           with a time budget which took longer than the budget.
+        """
+        return { control: policy.overruns for control, policy in self._callbackPolicies.items()
+                 if policy.budget is not None }
+    
+    
+    def getDroppedCounts(self):
+        """Returns a dictionary giving the number of changes of each control using the "latest"
+           callback policy which were replaced by a later change before the callback was called.
+        """
+        return { control: policy.dropped for control, policy in self._callbackPolicies.items()
+                 if isinstance(policy, WorkerDispatch) and policy.latestWins }
+    
+    
+    def setWatchdog(self, timeout, safeStop = None, resumed = None):
+        """Calls the safeStop function when no input reports have arrived from the controller for
+           timeout seconds, e.g. because the wireless link failed while a stick was held, so the
+           robot can be stopped. The watchdog runs on its own thread, so safeStop is called on time
+           even if your main loop is blocked, and must be safe to run alongside your main loop code.
+           See the Watchdog class for how late it can be. resumed is called (also on the watchdog
+           thread) when reports arrive again. Pass a timeout of None to turn the watchdog off.
+           
+           A controller only sends reports when its controls change, so safeStop is also called when
+           the controls are left alone for the timeout. Choose a timeout longer than the controls
+           are normally held still away from rest.
+        """
+        if self._watchdog is not None:
+            self._watchdog.stop()
+            self._watchdog = None
+        if timeout is not None:
+            if safeStop is None:
+                raise ValueError("A safe stop function is needed for the watchdog")
+            self._watchdog = Watchdog(timeout, lambda: self.lastInputTime, safeStop, resumed)
+    
+    
+    def getWatchdogStats(self):
+        """Returns a dictionary giving whether the watchdog has tripped (called safeStop and is
+           waiting for reports to resume), the number of times it has tripped, and the latest it
+           has called safeStop after the deadline in seconds. Returns None if the watchdog is off.
+        """
+        if self._watchdog is None:
+            return None
+        return {"tripped": self._watchdog.tripped, "trips": self._watchdog.trips,
+                "worstLateness": self._watchdog.worstLateness}
+    
+    
+    def setCallbackTiming(self, enabled = True, display = False):
+        """Enables timing every call of every callback function (including mouseDown), recording the
+           times in a histogram for each control. See getCallbackStats() and printCallbackStats().
+           
+           Args:
+               enabled: True to start timing callbacks, False to stop and discard the times
+               
+               display: True to show the 99th percentile and maximum time of each callback
+                   function in the status display
+        """
+        if enabled:
+            if self._callbackHistograms is None:
+                self._callbackHistograms = {}
+                for control in self.CONTROL_NAMES + ("mouseDown",):
+                    self._timeCallback(control)
+            self._displayCallbackStats = display
+        elif self._callbackHistograms is not None:
+            self._callbackHistograms = None
+            self._displayCallbackStats = False
+            for control, policy in list(self._callbackPolicies.items()):
+                policy.histogram = None
+                if type(policy) is InlineDispatch and policy.budget is None:
+                    #Only there for timing
+                    del self._callbackPolicies[control]
+    
+    
+    def getCallbackStats(self):
+        """Returns a dictionary of the timing statistics of each control whose callback function has
+           been called since callback timing was enabled (see LatencyHistogram.stats()). Returns an
+           empty dictionary when callback timing is not enabled.
+        """
+        if self._callbackHistograms is None:
+            return {}
+        return { control: histogram.stats() for control, histogram in self._callbackHistograms.items()
+                 if histogram.count > 0 }
+    
+    
+    def printCallbackStats(self):
+        """Prints a summary of the time taken by each callback function to the console, slowest first"""
+        if self._callbackHistograms is None:
+            print("Callback timing is not enabled")
+            return
+        histograms = [ (histogram.percentile(0.99), control, histogram)
+                       for control, histogram in self._callbackHistograms.items() if histogram.count > 0 ]
+        for p99, control, histogram in sorted(histograms, reverse=True):
+            print("{}: {}".format(control, histogram.summary()) )
+    
+    
+    def resetCallbackStats(self):
+        """Clears the times recorded for all the callback functions"""
+        if self._callbackHistograms is not None:
+            for histogram in self._callbackHistograms.values():
+                histogram.reset()
+    
+    
+    def setLoopTiming(self, enabled = True, size = 1000):
+        """Enables recording how long each part of each tick of the loop takes: processing the event
+           queue, reading the controls, callback functions, rendering the status display, updating
+           the display, sleeping to keep to the input rate and the time your application spends
+           between calls of controllerStatus(). The times of the most recent ticks are kept in a ring
+           buffer. See getLoopStats(), getLoopTimings() and dumpLoopTimings().
+           
+           Args:
+               enabled: True to start recording, False to stop and discard the recorded times
+               
+               size: The number of ticks to keep
+        """
+        if enabled:
+            self._loopTimer = LoopTimer(size, 1.0 / self.inputRate if self.inputRate > 0 else 0.0)
+        else:
+            self._loopTimer = None
+    
+    
+    def getLoopStats(self):
+        """Returns a dictionary summarising the recorded ticks: the achieved rate in ticks per second,
+           the mean and worst period between ticks, the number of ticks which missed their deadline
+           (took longer than the period of the input rate without sleeping) and the mean time spent
+           in each part of a tick (see LoopTimer.stats()). Returns an empty dictionary when loop
+           timing is not enabled.
+        """
+        if self._loopTimer is None:
+            return {}
+        return self._loopTimer.stats()
+    
+    
+    def getLoopTimings(self):
+        """Returns a list of LoopTiming tuples for the recorded ticks, oldest first"""
+        if self._loopTimer is None:
+            return []
+        return self._loopTimer.timings()
+    
+    
+    def dumpLoopTimings(self, path):
+        """Writes the recorded ticks to a CSV file"""
+        if self._loopTimer is None:
+            raise RuntimeError("Loop timing is not enabled")
+        self._loopTimer.dump(path)
+    
+    
+    def _timeCallback(self, control):
+        """Internal function which sets up timing of the callback function for a control"""
+        histogram = self._callbackHistograms.setdefault(control, LatencyHistogram())
+        policy = self._callbackPolicies.get(control)
+        if policy is None:
+            policy = InlineDispatch(None, self._reportOverrun)
+            self._callbackPolicies[control] = policy
+        policy.histogram = histogram
+    
+    
+    def _reportOverrun(self, control, duration, budget):
+        """Internal function reporting a callback function which took longer than its time budget"""
+        print("Callback for {} took {:.1f}ms, over its budget of {:.1f}ms".format(
+            control, duration * 1000, budget * 1000) )
+    
+    
+    def _callback(self, control, callback, *args):
+        """Internal function which calls the callback function for a control, applying any rate limit,
+           or queues it to be called on the main thread when the controller is read on the input thread.
+           Also passes the change to any asyncio event listeners and the recorder.
+        """
+        if self._reportAllChanges:
+            timestamp = time.monotonic()
+            if self._recorder is not None:
+                self._recorder.record(timestamp, control, args)
+            if self._eventListeners:
+                event = ControlEvent(control, args[0] if len(args) == 1 else args, timestamp)
+                for listener in self._eventListeners:
+                    if listener.controls is None or control in listener.controls:
+                        listener.add(event)
+        if callback is None:
+            return
+        if self._inputThread is not None and self.inputThreadCallbacks == False:
+            self._callbackQueue.append( (control, callback, args) )
+            return
+        limiter = self._rateLimits.get(control)
+        if limiter is None:
+            self._dispatchCallback(control, callback, args)
+        else:
+            limiter.call(self._dispatchCallback, (control, callback, args), time.monotonic())
+    
+    
+    def _dispatchCallback(self, control, callback, args):
+        """Internal function which calls a callback function using the policy set for its control"""
+        timer = self._loopTimer
+        if timer is not None and timer.threadId == threading.get_ident():
+            #Count the time as callback time rather than part of the phase of the loop calling it
+            start = time.monotonic()
+            self._callPolicy(control, callback, args)
+            timer.callbackTime += time.monotonic() - start
+        else:
+            self._callPolicy(control, callback, args)
+    
+    
+    def _callPolicy(self, control, callback, args):
+        """Internal function which calls a callback function using the policy set for its control"""
+        policy = self._callbackPolicies.get(control)
+        if policy is None:
+            callback(*args)
+        else:
+            policy.call(control, callback, args)
+    
+    
+    def _runQueuedCallbacks(self):
+        """Internal function which calls the callbacks queued by the input thread. When a stick or
+           trigger changed more than once since the last call, only its latest position is passed on.
+        """
+        queued = []
+        latestAnalogue = {}
+        while self._callbackQueue:
+            call = self._callbackQueue.popleft()
+            if call[0] in ("leftStick", "rightStick", "leftTrigger", "rightTrigger"):
+                #Keep the position in the queue of the first change, with the latest values
+                if call[0] in latestAnalogue:
+                    queued[latestAnalogue[call[0]]] = call
+                    continue
+                latestAnalogue[call[0]] = len(queued)
+            queued.append(call)
+        
+        now = time.monotonic()
+        for control, callback, args in queued:
+            limiter = self._rateLimits.get(control)
+            if limiter is None:
+                self._dispatchCallback(control, callback, args)
+            else:
+                limiter.call(self._dispatchCallback, (control, callback, args), now)
+    
+    
+    def _flushRateLimits(self):
+        """Internal function which calls any rate limited callback functions which have a value waiting
+           and are now due
+        """
+        now = time.monotonic()
+        for limiter in self._rateLimits.values():
+            limiter.flush(now)
+    
+    
+    def events(self, *controls):
+        """Returns an asynchronous iterator of ControlEvent changes for use from asyncio code:
+           
+               async for event in controller.events():
+                   print(event.control, event.value)
+           
+           Pass control names (see CONTROL_NAMES) to only receive changes to those controls. Every
+           control is read while there are listeners, whether or not it has a callback function.
+           The controller is serviced by a task on the running event loop, which takes the place of
+           calling controllerStatus() in a loop (see runAsync()). The iteration ends when the
+           application quits.
+           
+           If the events are read more slowly than the controls change, only the latest position
+           of each analogue stick and trigger is kept waiting, and at most 256 other changes, so
+           a consumer which stops reading cannot use up memory. Stop listening by breaking out of
+           the loop, or by calling aclose() on the iterator if it is not used in an async for loop.
+        """
+        return self._eventStream(self._addEventListener(controls))
+    
+    
+    async def waitFor(self, control, value = None):
+        """Waits until the named control changes, or changes to the given value if one is given, and
+           returns the ControlEvent for the change. Returns None if the application quits first.
+           For example, await controller.waitFor("crossXBtn", 1) waits for the X button to be pressed.
+        """
+        listener = self._addEventListener( (control,) )
+        try:
+            while True:
+                while listener.events:
+                    event = listener.nextEvent()
+                    if value is None or event.value == value:
+                        return event
+                if not await self._waitForEvents(listener):
+                    return None
+        finally:
+            self._removeEventListener(listener)
+    
+    
+    async def runAsync(self):
+        """Services the controller from the running asyncio event loop until the application quits,
+           calling the callback functions and updating the display just like calling controllerStatus()
+           in a loop, but without blocking the event loop between reads. Returns when the application
+           quits. This is started automatically when events() or waitFor() are used.
+        """
+        await self._startAsyncTask()
+    
+    
+    async def _eventStream(self, listener):
+        """Internal asynchronous generator yielding the events received by a listener"""
+        try:
+            while True:
+                while listener.events:
+                    yield listener.nextEvent()
+                if not await self._waitForEvents(listener):
+                    return
+        finally:
+            self._removeEventListener(listener)
+    
+    
+    def _addEventListener(self, controls):
+        """Internal function which registers a new listener for control changes"""
+        for control in controls:
+            if control not in self.CONTROL_NAMES:
+                raise ValueError("Unknown control {}".format(control))
+        listener = _EventListener(set(controls) if controls else None)
+        self._eventListeners.append(listener)
+        self._reportAllChanges = True
+        return listener
+    
+    
+    def _removeEventListener(self, listener):
+        """Internal function which removes a listener for control changes"""
+        self._eventListeners.remove(listener)
+        self._reportAllChanges = bool(self._eventListeners) or self._recorder is not None
+    
+    
+    async def _waitForEvents(self, listener):
+        """Internal function which waits until a listener has events. Returns False if the application
+           quit instead.
+        """
+        task = self._startAsyncTask()
+        while not listener.events:
+            if task.done():
+                #Raises any error which stopped the task
+                task.result()
+                return False
+            listener.waiter = asyncio.get_event_loop().create_future()
+            await asyncio.wait( (listener.waiter, task), return_when=asyncio.FIRST_COMPLETED )
+            listener.waiter = None
+        return True
+    
+    
+    def _startAsyncTask(self):
+        """Internal function which starts the task servicing the controller from the event loop, if it
+           is not already running. Returns the task.
+        """
+        if self._asyncTask is None:
+            self._asyncTask = asyncio.ensure_future( self._asyncServiceLoop() )
+        return self._asyncTask
+    
+    
+    async def _asyncServiceLoop(self):
+        """Internal function servicing the controller at the input rate from the asyncio event loop,
+           waking any listeners which received events
+        """
+        keepRunning = True
+        while keepRunning:
+            start = time.monotonic()
+            keepRunning = self._serviceController()
+            for listener in self._eventListeners:
+                if listener.events and listener.waiter is not None and not listener.waiter.done():
+                    listener.waiter.set_result(None)
+            if keepRunning:
+                delay = 0.0
+                if self.inputRate > 0:
+                    delay = 1.0 / self.inputRate - (time.monotonic() - start)
+                #Always yield to the event loop so other tasks can run between reads
+                await asyncio.sleep( max(0.0, delay) )
+                if self._loopTimer is not None:
+                    self._loopTimer.phase(stats.SLEEP_PHASE)
+                    self._loopTimer.endTick()
+    
+    
+    def startRecording(self, path, batchSize = 1024):
+        """Starts recording every change of every control, with the time it happened, to a binary
+           log file. Use replay() to pass the changes in a log to the callback functions again, e.g.
+           to reproduce a problem seen on the robot or to benchmark callback functions without a
+           controller. Records are written to the file in batches of batchSize records.
+        """
+        self.stopRecording()
+        self._recorder = InputRecorder(path, self.CONTROL_NAMES, batchSize)
+        self._reportAllChanges = True
+    
+    
+    def stopRecording(self):
+        """Stops recording, writing any remaining records to the log file. This is called
+           automatically when controllerStatus() returns False.
+        """
+        if self._recorder is not None:
+            recorder = self._recorder
+            self._recorder = None
+            self._reportAllChanges = bool(self._eventListeners)
+            recorder.close()
+    
+    
+    def replay(self, path, speed = 1.0):
+        """Replays a log file recorded by startRecording(), updating the state of each control and
+           passing each change to the callback functions (with any deadzones already applied when
+           recorded, but rate limits, callback policies and event listeners applied as usual).
+           Returns the number of changes replayed.
+           
+           Args:
+               path: The log file to replay
+               
+               speed: How fast to replay the changes: 1.0 for the same timing as when recorded,
+                   2.0 for twice as fast and so on, or 0 to replay as fast as possible
+        """
+        if speed < 0:
+            raise ValueError("Replay speed must not be negative")
+        names, records = readInputLog(path)
+        handlers = self._replayHandlers(names)
+        count = 0
+        if speed == 0:
+            for timestamp, index, value1, value2 in records:
+                handlers[index](value1, value2)
+                count += 1
+        else:
+            start = None
+            for timestamp, index, value1, value2 in records:
+                if start is None:
+                    start = timestamp
+                    replayStart = time.monotonic()
+                delay = replayStart + (timestamp - start) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                handlers[index](value1, value2)
+                count += 1
+        return count
+    
+    
+    def _replayHandlers(self, names):
+        """Internal function returning a function for each named control which sets the state of the
+           control from replayed values and passes them on to its callback function
+        """
+        handlers = []
+        for name in names:
+            if name in ("leftStick", "rightStick"):
+                handlers.append( self._replayStick(name) )
+            elif name in ("leftTrigger", "rightTrigger"):
+                handlers.append( self._replayTrigger(name) )
+            elif name == "hat":
+                handlers.append( self._replayHat )
+            elif name in self.CONTROL_NAMES:
+                handlers.append( self._replayButton(name) )
+            else:
+                raise ValueError("Input log has unknown control {}".format(name))
+        return handlers
+    
+    
+    def _replayStick(self, control):
+        """Internal function returning the replay function for a stick"""
+        lrName, udName, callbackName = control + "LR", control + "UD", control + "Changed"
+        def replayStick(valueLR, valueUD):
+            setattr(self, lrName, valueLR)
+            setattr(self, udName, valueUD)
+            self._callback(control, getattr(self, callbackName), valueLR, valueUD)
+        return replayStick
+    
+    
+    def _replayTrigger(self, control):
+        """Internal function returning the replay function for a trigger"""
+        stateName, callbackName = control + "Pos", control + "Changed"
+        def replayTrigger(value, unused):
+            setattr(self, stateName, value)
+            self._callback(control, getattr(self, callbackName), value)
+        return replayTrigger
+    
+    
+    def _replayHat(self, valueLR, valueUD):
+        """Internal function replaying a change of the hat"""
+        self.hatLRState = int(valueLR)
+        self.hatUDState = int(valueUD)
+        self._callback("hat", self.hatChanged, self.hatLRState, self.hatUDState)
+    
+    
+    def _replayButton(self, control):
+        """Internal function returning the replay function for a button"""
+        callbackName = control + "Changed"
+        stateName = [stateName for controlName, btnName, stateName, name in self.BUTTON_CONTROLS
+                     if name == callbackName][0]
+        #Keep the state the button is compared with when read in step, if the controller has it
+        entries = [button for button in self._buttons if button[5] == control]
+        def replayButton(value, unused):
+            value = int(value)
+            setattr(self, stateName, value)
+            for button in entries:
+                button[3] = value
+            self._callback(control, getattr(self, callbackName), value)
+        return replayButton
+    
+    
+    def getState(self):
+        """Returns a ControllerState holding the latest state of every control. This never waits, so
+           it can be called from your main loop at any time to read the controller, including while
+           the controller is being read on the input thread.
+           
+           Without the input thread, controls which have no callback function are only read while
+           the status display is shown, so their state is only kept up to date then.
+        """
+        if self._inputThread is not None:
+            return self._state
+        return self._captureState()
+    
+    
+    def stopInputThread(self):
+        """Stops the input thread if it is running and waits for it to finish. This is called
+           automatically when controllerStatus() returns False. Once stopped, controllerStatus()
+           reads the controller itself again, so getState() keeps returning the latest state.
+        """
+        if self._inputThread is not None:
+            self._stopInputThread.set()
+            if self._inputThread is not threading.current_thread():
+                self._inputThread.join()
+                self._stopInputThread.clear()
+            self._inputThread = None
+            #In event driven mode the events were not handled while the input thread was running,
+            #so read every control once to catch up
+            self._syncPending = True
+    
+    
+    def _captureState(self):
+        """Internal function returning a snapshot of the current state of all the controls"""
+        values = [getattr(self, field) for field in ControllerState._fields[:-1]]
+        values.append( time.monotonic() )
+        return ControllerState(*values)
+    
+    
+    def _startInputThread(self):
+        """Internal function which starts reading the controller on a background thread"""
+        if sdlController is not None:
+            sdlController.init()
+        #Publish a first snapshot so getState() has something to return before the first read
+        self._state = self._captureState()
+        self._inputThread = threading.Thread(target=self._inputThreadLoop, name="RobotController input",
+                                             daemon=True)
+        self._inputThread.start()
+    
+    
+    def _inputThreadLoop(self):
+        """Internal function run on the input thread which reads the controller at the input rate,
+           publishing a new state snapshot after each read
+        """
+        nextRead = time.monotonic()
+        try:
+            while not self._stopInputThread.is_set():
+                if sdlController is not None:
+                    #Update the joystick state directly, as the main thread may be too busy to
+                    #process the event queue
+                    sdlController.update()
+                self.backend.update()
+                #Read every control, so the snapshots are complete even for controls without callbacks
+                with self._connectionLock:
+                    if self.connected:
+                        for process in self._displayPollPlan:
+                            process()
+                        if self._reconnectTime is not None:
+                            self._reportReconnected()
+                        if self._smoothingFilters:
+                            self._lastTickTime = time.monotonic()
+                    state = self._captureState()
+                if self.inputThreadCallbacks and self._rateLimits:
+                    self._flushRateLimits()
+                #Replacing the snapshot is a single reference assignment, so readers never see
+                #a partly updated state and never need to wait for a lock
+                if self._watchdog is not None and state[:-1] != self._state[:-1]:
+                    #Changes read here are input reports too, as the main thread may be too busy to
+                    #process the joystick events
+                    self.lastInputTime = state.timestamp
+                self._state = state
+                
+                if self.inputRate > 0:
+                    nextRead += 1.0 / self.inputRate
+                    delay = nextRead - time.monotonic()
+                    if delay > 0:
+                        self._stopInputThread.wait(delay)
+                    else:
+                        #Fallen behind, so restart the schedule from now rather than catching up
+                        nextRead = time.monotonic()
+        except Exception as e:
+            #Report errors from callback functions on the main thread
+            self._inputThreadError = e
+    
+    
+    def _pollControls(self):
+        """Internal function which reads all the controls in the poll plan"""
+        if self.displayControllerOutput == True or self._reportAllChanges:
+            pollPlan = self._displayPollPlan
+        else:
+            pollPlan = self._callbackPollPlan
+        for process in pollPlan:
+            process()
+    
+    
+    def _processEvents(self):
+        """Internal function to handle the pygame event queue. Returns False if the user requested to quit"""
+        keepRunning = True
+        #Control processing functions to call, keyed by function so each is called once per tick
+        changedControls = {}
+        for event in pygame.event.get(): # User did something
+            if self._handleEvent(event, changedControls) == False:
+                keepRunning = False # Flag that we are done so we exit this loop
+        
+        #Process the controls which reported changes
+        for handler in changedControls:
+            handler()
+        
+        return keepRunning
+    
+    
+    def _handleEvent(self, event, changedControls):
+        """Internal function handling one pygame event. In event driven mode the functions processing
+           the controls which reported changes are added to the changedControls dictionary, to be
+           called once all the events have been handled. Returns False if the user clicked close.
+        """
+        if ( (event.type == pygame.MOUSEBUTTONDOWN)
+        and (self.mouseDown is not None) ):
+            self._dispatchCallback("mouseDown", self.mouseDown, (pygame.mouse.get_pos(), event.button) )
+        elif event.type == pygame.QUIT: # If user clicked close
+            return False
+        elif event.type == JOYDEVICEREMOVED:
+            if self.connected and self._eventJoystickId(event) == self._joystickId:
+                self._controllerRemoved()
+        elif event.type == JOYDEVICEADDED:
+            if not self.connected:
+                self._controllerAdded(event.device_index)
+        elif event.type in JOYSTICK_EVENTS:
+            if self._eventJoystickId(event) != self._joystickId:
+                return True
+            #The controller is still sending input reports
+            self.lastInputTime = time.monotonic()
+            if self.eventDriven == True and self._inputThread is None:
+                if event.type == pygame.JOYAXISMOTION:
+                    handlers = self._axisHandlers.get(event.axis)
+                elif event.type in (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP):
+                    handlers = self._buttonHandlers.get(event.button)
+                elif event.type == pygame.JOYHATMOTION:
+                    handlers = self._hatHandlers.get(event.hat)
+                else:
+                    return True
+                if handlers is not None:
+                    for handler in handlers:
+                        changedControls[handler] = True
+        return True
+    
+    
+    def _controllerRemoved(self):
+        """Internal function called when the controller is disconnected, which returns every control
+           to rest and stops reading the controller until it is connected again
+        """
+        with self._connectionLock:
+            self.connected = False
+            self._disconnectTime = time.monotonic()
+            print("Controller disconnected")
+            self._resetControls()
+        if self._inputThread is not None and self.inputThreadCallbacks == False:
+            #Pass on the rest positions straight away rather than on the next tick
+            self._runQueuedCallbacks()
+        if self.connectionChanged is not None:
+            self.connectionChanged(False)
+    
+    
+    def _controllerAdded(self, deviceIndex):
+        """Internal function called when a joystick is connected while the controller is disconnected.
+           If it is a supported controller, it is set up and reading resumes.
+        """
+        addedTime = time.monotonic()
+        joystick = self.backend.getJoystick(deviceIndex)
+        joystick.init()
+        name = joystick.get_name()
+        axes = joystick.get_numaxes()
+        btns = joystick.get_numbuttons()
+        hats = joystick.get_numhats()
+        profile = self.PROFILES.match(name, axes, btns, hats)
+        if profile is None:
+            print( self.PROFILES.explainMismatch(name, axes, btns, hats) )
+            return
+        print("Joystick {} reconnected as ".format(deviceIndex) + name )
+        with self._connectionLock:
+            self.controller = joystick
+            self.profile = profile
+            self.DETECTED_JOYSTICK_IDX = self.PROFILES.index(profile)
+            self._buildControlMaps()
+            self.buildPollPlan()
+            self._reconnectTime = addedTime
+            self.lastInputTime = addedTime
+            self.connected = True
+        if self.connectionChanged is not None:
+            self.connectionChanged(True)
+    
+    
+    def _reportReconnected(self):
+        """Internal function reporting how long it took to read the controls again after reconnecting"""
+        self.reconnectLatency = time.monotonic() - self._reconnectTime
+        print("Controller reconnected after {:.1f}s, controls read {:.1f}ms after it was connected".format(
+            self._reconnectTime - self._disconnectTime, self.reconnectLatency * 1000) )
+        self._reconnectTime = None
+    
+    
+    def _resetControls(self):
+        """Internal function which returns every control to its rest position, calling the callback
+           functions of the controls which were not at rest
+        """
+        if self.leftStickLR != 0.0 or self.leftStickUD != 0.0:
+            self.leftStickLR = self.leftStickUD = 0.0
+            self._callback("leftStick", self.leftStickChanged, 0.0, 0.0)
+        if self.rightStickLR != 0.0 or self.rightStickUD != 0.0:
+            self.rightStickLR = self.rightStickUD = 0.0
+            self._callback("rightStick", self.rightStickChanged, 0.0, 0.0)
+        #Triggers report zero again until first used after reconnecting
+        self.leftTriggerActivated = False
+        if self.leftTriggerPos != -1.0:
+            self.leftTriggerPos = -1.0
+            self._callback("leftTrigger", self.leftTriggerChanged, -1.0)
+        self.rightTriggerActivated = False
+        if self.rightTriggerPos != -1.0:
+            self.rightTriggerPos = -1.0
+            self._callback("rightTrigger", self.rightTriggerChanged, -1.0)
+        #Smoothing starts again from the first value read after reconnecting
+        for control, filters in self._smoothingFilters.items():
+            if control in ("leftStick", "rightStick"):
+                for smoothing in filters:
+                    if smoothing is not None:
+                        smoothing.reset()
+            else:
+                filters.reset()
+        self.hatBtnStates = (0, 0, 0, 0)
+        if self.hatLRState != 0 or self.hatUDState != 0:
+            self.hatLRState = self.hatUDState = 0
+            self._callback("hat", self.hatChanged, 0, 0)
+        for button in self._buttons:
+            if button[3] != 0:
+                button[3] = 0
+                setattr(self, button[1], 0)
+                self._callback( button[5], button[2], 0 )
+    
+    
+    def _eventJoystickId(self, event):
+        """Internal function returning the id of the joystick which generated a joystick event"""
+        #Pygame 2 identifies joysticks in events by instance id, older versions used the device index
+        instanceId = getattr(event, "instance_id", None)
+        if instanceId is None:
+            return event.joy
+        return instanceId
+    
+    
+    def _buildControlMaps(self):
+        """Internal function which works out which controls are present on the detected controller,
+           and maps the joystick axis, button and hat indices used in pygame events back to the
+           functions which process the logical controls they belong to.
+        """
+        profile = self.profile
+        
+        if hasattr(self.controller, "get_instance_id"):
+            self._joystickId = self.controller.get_instance_id()
+        else:
+            self._joystickId = self.controller.get_id()
+        
+        numAxes = self.controller.get_numaxes()
+        if self.axisValues is None or len(self.axisValues) != numAxes:
+            self.axisValues = array("d", [0.0]) * numAxes
+        
+        self._axisHandlers = {}
+        self._buttonHandlers = {}
+        self._hatHandlers = {}
+        
+        def addHandler(handlers, controlIdx, handler):
+            handlers.setdefault(controlIdx, []).append(handler)
+        
+        #Look up the indices of the controls on this controller once, rather than on every read
+        self._leftStickAxes = (profile.leftStickLR, profile.leftStickUD)
+        self._hasLeftStick = -1 not in self._leftStickAxes
+        if self._hasLeftStick:
+            leftStickReader = self._axisReader(self._leftStickAxes, self._processLeftStick)
+            for axis in self._leftStickAxes:
+                addHandler(self._axisHandlers, axis, leftStickReader)
+        
+        self._rightStickAxes = (profile.rightStickLR, profile.rightStickUD)
+        self._hasRightStick = -1 not in self._rightStickAxes
+        if self._hasRightStick:
+            rightStickReader = self._axisReader(self._rightStickAxes, self._processRightStick)
+            for axis in self._rightStickAxes:
+                addHandler(self._axisHandlers, axis, rightStickReader)
+        
+        self._leftTriggerAxis = profile.leftTrigger
+        self._hasLeftTrigger = self._leftTriggerAxis != -1
+        if self._hasLeftTrigger:
+            addHandler(self._axisHandlers, self._leftTriggerAxis,
+                       self._axisReader((self._leftTriggerAxis,), self._processLeftTrigger) )
+        
+        self._rightTriggerAxis = profile.rightTrigger
+        self._hasRightTrigger = self._rightTriggerAxis != -1
+        if self._hasRightTrigger:
+            addHandler(self._axisHandlers, self._rightTriggerAxis,
+                       self._axisReader((self._rightTriggerAxis,), self._processRightTrigger) )
+        
+        self._hatIndex = profile.hat
+        self._hasHat = self._hatIndex != -1
+        self._hasHatButtons = False
+        if self._hasHat:
+            addHandler(self._hatHandlers, self._hatIndex, self._processHat)
+        elif (profile.hatUp != -1
+        and   profile.hatDown != -1
+        and   profile.hatLeft != -1
+        and   profile.hatRight != -1 ):
+            #Hat buttons detected as separate buttons
+            self._hasHatButtons = True
+            self._hatButtons = (profile.hatLeft, profile.hatRight, profile.hatUp, profile.hatDown)
+            for hatBtnIdx in self._hatButtons:
+                addHandler(self._buttonHandlers, hatBtnIdx, self._processHat)
+        
+        #Simple buttons as [button index, state attribute name, callback, last state, display name,
+        #control name] lists
+        self._buttons = []
+        for controlName, btnName, stateName, callbackName in self.BUTTON_CONTROLS:
+            #Lower front buttons are only handled as simple buttons when there is no analogue trigger
+            if controlName == "leftBtn2" and self._hasLeftTrigger:
+                continue
+            if controlName == "rightBtn2" and self._hasRightTrigger:
+                continue
+            btnIdx = getattr(profile, controlName)
+            if btnIdx != -1:
+                button = [btnIdx, stateName, getattr(self, callbackName), getattr(self, stateName), btnName,
+                          callbackName[:-len("Changed")] ]
+                self._buttons.append(button)
+                addHandler(self._buttonHandlers, btnIdx,
+                           lambda buttons=[button]: self._processButtons(buttons) )
+        
+        #In event driven mode all the controls are read once to pick up their starting positions
+        self._syncPending = True
+    
+    
+    def _processLeftStick(self):
+        """Internal function to process the left analogue stick, once its axes have been read"""
+        #Get stick postitions
+        shaped = self._shapeStick("leftStick", self.axisValues[ self._leftStickAxes[0] ],
+                                  self.axisValues[ self._leftStickAxes[1] ], self.leftStickLR, self.leftStickUD)
+        if shaped is None:
+            return
+        leftStickLR, leftStickUD = shaped
+        #Call the callback function if defined and stick position has changed since last called
+        if self.leftStickLR != leftStickLR or self.leftStickUD != leftStickUD :
+            self.leftStickLR = leftStickLR
+            self.leftStickUD = leftStickUD
+            if self.leftStickChanged is not None or self._reportAllChanges:
+                self._callback("leftStick", self.leftStickChanged, self.leftStickLR, self.leftStickUD )
+    
+    
+    def _processRightStick(self):
+        """Internal function to process the right analogue stick, once its axes have been read"""
+        #Get stick postitions
+        shaped = self._shapeStick("rightStick", self.axisValues[ self._rightStickAxes[0] ],
+                                  self.axisValues[ self._rightStickAxes[1] ], self.rightStickLR, self.rightStickUD)
+        if shaped is None:
+            return
+        rightStickLR, rightStickUD = shaped
+        #Call the callback function if defined and stick position has changed since last called
+        if self.rightStickLR != rightStickLR or self.rightStickUD != rightStickUD :
+            self.rightStickLR = rightStickLR
+            self.rightStickUD = rightStickUD
+            if self.rightStickChanged is not None or self._reportAllChanges:
+                self._callback("rightStick", self.rightStickChanged, self.rightStickLR, self.rightStickUD )
+    
+    
+    def _shapeStick(self, stick, stickLR, stickUD, lastLR, lastUD):
+        """Internal function which applies the smoothing filters, response curves and deadzone set for
+           the left or right stick to the values read from its axes. Returns the (left/right, up/down)
+           position to pass on, or None if the stick has not moved enough since the last position
+           passed on.
+        """
+        filters = self._smoothingFilters.get(stick)
+        if filters is not None:
+            #Smooth the axes, processing the stick again next tick until the filters settle
+            dt = self._smoothingStep()
+            if filters[0] is not None:
+                stickLR = filters[0].filter(stickLR, dt)
+                if not filters[0].settled:
+                    self._forceAxisProcessing()
+            if filters[1] is not None:
+                stickUD = filters[1].filter(stickUD, dt)
+                if not filters[1].settled:
+                    self._forceAxisProcessing()
+        curves = self._curves.get(stick)
+        if curves is not None:
+            #Shape the axes with their response curves
+            if curves[0] is not None:
+                stickLR = curves[0].apply(stickLR)
+            if curves[1] is not None:
+                stickUD = curves[1].apply(stickUD)
+        deadzone = self._deadzones.get(stick)
+        if deadzone is not None:
+            #Apply deadzones, skipping the update if the stick has not moved enough
+            return deadzone.filterStick(stickLR, stickUD, lastLR, lastUD)
+        return stickLR, stickUD
+    
+    
+    def _processLeftTrigger(self):
+        """Internal function to process the left analogue trigger, once its axis has been read"""
+        #Get trigger value
+        leftTrigger = self.axisValues[ self._leftTriggerAxis ]
+        #Analogue triggers return zero until first used, even through their rest status is -1
+        #so we need to detect the first time they return a non-zero value to activate them and
+        #start returning their value to the callback function.
+        if self.leftTriggerActivated == False :
+            if leftTrigger != 0.0 :
+                self.leftTriggerActivated = True
+            else:
+                return
+        leftTrigger = self._shapeTrigger("leftTrigger", leftTrigger, self.leftTriggerPos)
+        if leftTrigger is None:
+            return
+        #Call the callback function if defined and trigger position has changed since last called
+        if self.leftTriggerPos != leftTrigger :
+            self.leftTriggerPos = leftTrigger
+            if self.leftTriggerChanged is not None or self._reportAllChanges:
+                self._callback("leftTrigger", self.leftTriggerChanged, self.leftTriggerPos )
+    
+    
+    def _processRightTrigger(self):
+        """Internal function to process the right analogue trigger, once its axis has been read"""
+        #Get trigger value
+        rightTrigger = self.axisValues[ self._rightTriggerAxis ]
+        #Analogue triggers return zero until first used, even through their rest status is -1
+        #so we need to detect the first time they return a non-zero value to activate them and
+        #start returning their value to the callback function.
+        if self.rightTriggerActivated == False :
+            if rightTrigger != 0.0 :
+                self.rightTriggerActivated = True
+            else:
+                return
+        rightTrigger = self._shapeTrigger("rightTrigger", rightTrigger, self.rightTriggerPos)
+        if rightTrigger is None:
+            return
+        #Call the callback function if defined and trigger position has changed since last called
+        if self.rightTriggerPos != rightTrigger :
+            self.rightTriggerPos = rightTrigger
+            if self.rightTriggerChanged is not None or self._reportAllChanges:
+                self._callback("rightTrigger", self.rightTriggerChanged, self.rightTriggerPos )
+    
+    
+    def _shapeTrigger(self, trigger, value, lastValue):
+        """Internal function which applies the smoothing filter, response curve and deadzone set for
+           the left or right trigger to the value read from its axis. Returns the value to pass on,
+           or None if the trigger has not moved enough since the last value passed on.
+        """
+        smoothing = self._smoothingFilters.get(trigger)
+        if smoothing is not None:
+            #Smooth the trigger, processing it again next tick until the filter settles
+            value = smoothing.filter(value, self._smoothingStep())
+            if not smoothing.settled:
+                self._forceAxisProcessing()
+        curve = self._curves.get(trigger)
+        if curve is not None:
+            value = curve.apply(value)
+        deadzone = self._deadzones.get(trigger)
+        if deadzone is not None:
+            #Apply deadzone, skipping the update if the trigger has not moved enough
+            return deadzone.filterTrigger(value, lastValue)
+        return value
+    
+    
+    def _processHat(self):
+        """Internal function to read the 4-way hat, or the hat buttons on controllers which
+           present the hat as separate buttons.
+        """
+        if self._hasHat:
+            hatState = self.controller.get_hat( self._hatIndex )
+            hatLR = hatState[0]
+            hatUD = hatState[1]
+        else:
+            #Process hat buttons where detected as separate buttons
+            hatLeftIdx, hatRightIdx, hatUpIdx, hatDownIdx = self._hatButtons
+            hatUpBtn = self.controller.get_button( hatUpIdx )
+            hatDownBtn = self.controller.get_button( hatDownIdx )
+            if hatUpBtn == 1 :
+                hatUD = 1
+            elif hatDownBtn == 1 :
+                hatUD = -1
+            else:
+                hatUD = 0
+            hatLeftBtn = self.controller.get_button( hatLeftIdx )
+            hatRightBtn = self.controller.get_button( hatRightIdx )
+            if hatLeftBtn == 1 :
+                hatLR = -1
+            elif hatRightBtn == 1 :
+                hatLR = 1
+            else:
+                hatLR = 0
+            self.hatBtnStates = (hatLeftBtn, hatRightBtn, hatUpBtn, hatDownBtn)
+                
+        #Update Hat state if any button states changed
+        if self.hatUDState != hatUD or self.hatLRState != hatLR :
+            self.hatUDState = hatUD
+            self.hatLRState = hatLR
+            if self.hatChanged is not None or self._reportAllChanges:
+                self._callback("hat", self.hatChanged, self.hatLRState, self.hatUDState )
+    
+    
+    def _processButtons(self, buttons):
+        """Internal function to read a list of simple buttons, calling the callback function of
+           any button which changed state
+        """
+        get_button = self.controller.get_button
+        for button in buttons:
+            btnState = get_button( button[0] )
+            #Call the callback function if defined and button state has changed since last called
+            if button[3] != btnState :
+                button[3] = btnState
+                setattr(self, button[1], btnState)
+                if button[2] is not None or self._reportAllChanges:
+                    self._callback( button[5], button[2], btnState )
+    
+    
+    def _displayStatus(self):
+        """Internal function which displays the status of all controls on screen"""
+        #Initialise screen display of controller status. The screen only needs clearing if something
+        #other than the status display was shown last time, otherwise only the changes are drawn
+        if self._statusDisplayed:
+            self.textPrint.startUpdate()
+        else:
+            self.textPrint.reset()
+        if self.connected:
+            self.textPrint.print("Controller: " + self.profile.displayName )
+        else:
+            self.textPrint.print("Disconnected: " + self.profile.displayName )
+        self.textPrint.indent()
+        
+        #Analogue sticks
+        if self._hasLeftStick:
+            #Display stick position on screen
+            self.textPrint.print("Left Stick:" )
+            self.textPrint.indent()
+            self.textPrint.printValue("Left/Right: ", self.leftStickLR )
+            self.textPrint.printValue("Up/Down: ", self.leftStickUD )
+            self.textPrint.unindent()
+        if self._hasRightStick:
+            #Display stick position on screen
+            self.textPrint.print("Right Stick:" )
+            self.textPrint.indent()
+            self.textPrint.printValue("Left/Right: ", self.rightStickLR )
+            self.textPrint.printValue("Up/Down: ", self.rightStickUD )
+            self.textPrint.unindent()
+        
+        #Analogue triggers
+        self.textPrint.print("Front Analogue Triggers:" )
+        self.textPrint.indent()
+        if self._hasLeftTrigger:
+            self.textPrint.printValue("Left Trigger: ", self.leftTriggerPos )
+        else:
+            self.textPrint.print("No analogue Left Trigger on this controller" )
+        if self._hasRightTrigger:
+            self.textPrint.printValue("Right Trigger: ", self.rightTriggerPos )
+        else:
+            self.textPrint.print("No analogue Right Trigger on this controller" )
+        self.textPrint.unindent()
+        
+        #Hats
+        if self._hasHat:
+            self.textPrint.print("4-way hat:" )
+            self.textPrint.indent()
+            self.textPrint.printValue("Left/Right: ", self.hatLRState )
+            self.textPrint.printValue("Up/Down: ", self.hatUDState )
+            self.textPrint.unindent()
+        elif self._hasHatButtons:
+            hatLeftBtn, hatRightBtn, hatUpBtn, hatDownBtn = self.hatBtnStates
+            self.textPrint.print("4-way hat buttons:" )
+            self.textPrint.indent()
+            self.textPrint.printValue("Left: ", hatLeftBtn )
+            self.textPrint.printValue("Right: ", hatRightBtn )
+            self.textPrint.printValue("Up: ", hatUpBtn )
+            self.textPrint.printValue("Down: ", hatDownBtn )
+            self.textPrint.unindent()
+            self.textPrint.print("Converted to Hat values:" )
+            self.textPrint.indent()
+            self.textPrint.printValue("Left/Right: ", self.hatLRState )
+            self.textPrint.printValue("Up/Down: ", self.hatUDState )
+            self.textPrint.unindent()
+        
+        #Buttons
+        self.textPrint.print("Simple buttons:" )
+        self.textPrint.indent()
+        for btnIdx, stateName, btnCallback, btnState, btnName, controlName in self._buttons:
+            self.textPrint.printValue(btnName + ": ", btnState )
+        
+        #Display any message text set outside the class
+        self.textPrint.unindent()
+        self.textPrint.print("")
+        self.textPrint.print( self.message )
+        
+        if self._displayCallbackStats:
+            self.textPrint.print("Callback times p99/max (ms):" )
+            self.textPrint.indent()
+            for control, histogram in self._callbackHistograms.items():
+                if histogram.count > 0:
+                    self.textPrint.print("{}: {:.1f} / {:.1f}".format(
+                        control, histogram.percentile(0.99) * 1000, histogram.maximum * 1000) )
+            self.textPrint.unindent()
+    
+
+class _ManagedController(RobotController):
+    """Internal RobotController for one of the controllers read by a ControllerManager, which draws
+       its status display in the manager's window rather than creating its own
+    """
+    
+    def _setUpDisplay(self, title):
+        self.screen = None
+        self.textPrint = None
+
+
+class ControllerManager:
+    """Reads several game controllers at once, e.g. one to drive a robot and one to move its arm.
+       Each controller is detected as for a RobotController, has its own profile and callback
+       functions, and can be disconnected and reconnected on its own. All the controllers are read
+       in one pass by controllerStatus(), sharing one pass over the pygame event queue and one clock,
+       so the time taken by each tick grows with the controls which need reading rather than with
+       the number of controllers.
+       
+       Args:
+            title: The title of the window, which shows the status display of each controller side by side
+            
+            initStatus: A callback function which is passed progress values while waiting for the
+                controllers to be connected, 0 when they have all been detected, or -1 if not enough
+                supported controllers were found within detectTimeout seconds.
+            
+            controllers: A list with one dictionary for each controller, in the order they are
+                detected, holding the RobotController arguments for that controller, e.g.
+                [{"leftStickChanged": drive}, {"leftStickChanged": moveArm, "eventDriven": True}].
+                Callback functions and the eventDriven argument can be given. The arguments in
+                MANAGED_ARGUMENTS are set by the ControllerManager, so giving them raises a ValueError.
+            
+            inputRate, displayRate, headless, backend, detectTimeout: As for a RobotController,
+                shared by all the controllers.
+            
+       The RobotController for each controller is in the controllers list, so its other functions
+       (e.g. setDeadzone() or getState()) can be used as normal.
+    """
+    
+    #Width of the status display of each controller in the window
+    DISPLAY_WIDTH = 400
+    DISPLAY_HEIGHT = 500
+    
+    #RobotController arguments which are shared by all the controllers or are set by the manager
+    #itself, so cannot be given in the dictionary for one controller. The manager reads every
+    #controller in one pass, so none of them can have its own input thread.
+    MANAGED_ARGUMENTS = ("title", "initStatus", "inputRate", "displayRate", "headless", "backend",
+                         "detectTimeout", "inputThread", "joystick")
+    
+    def __init__(self, title, initStatus, controllers, inputRate = 20, displayRate = 20, headless = False,
+                 backend = None, detectTimeout = 16):
+        if displayRate <= 0:
+            raise ValueError("Display rate must be greater than 0, not {}".format(displayRate))
+        for position, options in enumerate(controllers):
+            managed = [name for name in self.MANAGED_ARGUMENTS if name in options]
+            if managed:
+                raise ValueError("Controller {} arguments cannot include {}, as these are set by the "
+                                 "ControllerManager".format(position, ", ".join(managed)))
+        self.inputRate = inputRate
+        self.displayRate = displayRate
+        self.headless = headless
+        self.controllers = []
+        self.initialised = False
+        self._quitRequested = False
+        
+        if self.headless:
+            #No window will be created, so pygame must not try to open a real display
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        
+        if backend is None:
+            backend = PygameBackend()
+        self.backend = backend
+        self.backend.init()
+        detected = RobotController.detectControllers(self.backend, initStatus, len(controllers), detectTimeout)
+        if not detected:
+            self.backend.quit()
+            initStatus(-1)
+            return
+        
+        for (joystick, profile), options in zip(detected, controllers):
+            self.controllers.append( _ManagedController(title, lambda status: None, inputRate = inputRate,
+                                                        displayRate = displayRate, headless = headless,
+                                                        backend = self.backend, joystick = joystick, **options) )
+        
+        self.clock = pygame.time.Clock()
+        self._displaySchedule = _DisplaySchedule()
+        if self.headless:
+            self.screen = None
+            _installQuitSignalHandlers(self.requestQuit)
+        else:
+            pygame.font.init()
+            self.screen = pygame.display.set_mode( [self.DISPLAY_WIDTH * len(self.controllers), self.DISPLAY_HEIGHT] )
+            pygame.display.set_caption(title)
+            #Each controller draws its status display on its own part of the window
+            for position, controller in enumerate(self.controllers):
+                controller.screen = self.screen.subsurface( pygame.Rect(self.DISPLAY_WIDTH * position, 0,
+                                                                        self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT) )
+                controller.textPrint = TextPrint(controller.screen)
+            pygame.display.flip()
+        
+        self.initialised = True
+    
+    
+    def controllerStatus(self):
+        """Checks the status of the inputs of every controller, calling their callback functions.
+           Displays the status of all the controllers on screen and returns a flag indicating whether
+           to quit. Call this in a loop as for RobotController.controllerStatus().
+        """
+        keepRunning = self._serviceControllers()
+        
+        # Limit the rate the controllers are read at
+        self.clock.tick(self.inputRate)
+        
+        for timer in self._loopTimers():
+            timer.phase(stats.SLEEP_PHASE)
+            timer.endTick()
+        
+        return keepRunning
+    
+    
+    def requestQuit(self):
+        """Requests the application to quit. The next call to controllerStatus() will return False.
+           Calling requestQuit() on any of the controllers does the same.
+        """
+        self._quitRequested = True
+    
+    
+    def _serviceControllers(self):
+        """Internal function which does all the work of controllerStatus() without waiting. Returns
+           False if the application should quit.
+        """
+        #The loop timings of each controller which has them turned on (see setLoopTiming()) are
+        #recorded for the whole pass, as the controllers share it
+        timers = self._loopTimers()
+        for timer in timers:
+            timer.startTick()
+        
+        self.backend.update()
+        
+        #Process the event queue once for all the controllers, passing joystick events only to the
+        #controller reading that joystick. Joystick events also tell the watchdog of the controller
+        #that input reports are arriving.
+        keepRunning = True
+        changedControls = {}
+        controllersById = None
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                keepRunning = False
+            elif event.type == JOYDEVICEADDED:
+                self._joystickAdded(event.device_index)
+                #Route the events from a reconnected controller to it straight away
+                controllersById = None
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                for controller in self.controllers:
+                    controller._handleEvent(event, changedControls)
+            else:
+                joystickId = getattr(event, "instance_id", None)
+                if joystickId is None:
+                    joystickId = getattr(event, "joy", None)
+                    if joystickId is None:
+                        continue
+                if controllersById is None:
+                    controllersById = { controller._joystickId: controller
+                                        for controller in self.controllers if controller.connected }
+                controller = controllersById.get(joystickId)
+                if controller is not None:
+                    controller._handleEvent(event, changedControls)
+                    if event.type == JOYDEVICEREMOVED:
+                        controllersById = None
+        
+        #Process the controls which reported changes, then read the controls due to be read
+        for handler in changedControls:
+            handler()
+        for timer in timers:
+            timer.phase(stats.EVENTS_PHASE)
+        for controller in self.controllers:
+            if controller._loopTimer is not None:
+                #Reading the other controllers counts as event time for this one
+                controller._loopTimer.phase(stats.EVENTS_PHASE)
+            with controller._connectionLock:
+                controller._serviceInput()
+            if controller._loopTimer is not None:
+                controller._loopTimer.phase(stats.INPUT_PHASE)
+        
+        #Redraw the window only when it is due at the display rate
+        if self.headless == False and self._displaySchedule.due(self.displayRate):
+            dirtyRects = self._displayStatus()
+            for timer in timers:
+                timer.phase(stats.RENDER_PHASE)
+            pygame.display.update(dirtyRects)
+            for timer in timers:
+                timer.phase(stats.FLIP_PHASE)
+        
+        for controller in self.controllers:
+            controller._raiseThreadErrors()
+            if controller._quitRequested:
+                keepRunning = False
+        if self._quitRequested:
+            keepRunning = False
+        
+        if keepRunning == False:
+            for controller in self.controllers:
+                controller._shutdown()
+        
+        return keepRunning
+    
+    
+    def _loopTimers(self):
+        """Internal function returning the loop timers of the controllers which have loop timing on"""
+        return [controller._loopTimer for controller in self.controllers if controller._loopTimer is not None]
+    
+    
+    def _joystickAdded(self, deviceIndex):
+        """Internal function giving a newly connected joystick to the first disconnected controller,
+           unless it is already being read by one of the controllers
+        """
+        joystick = self.backend.getJoystick(deviceIndex)
+        joystickId = joystick.get_instance_id() if hasattr(joystick, "get_instance_id") else joystick.get_id()
+        for controller in self.controllers:
+            if controller.connected and controller._joystickId == joystickId:
+                return
+        for controller in self.controllers:
+            if not controller.connected:
+                controller._controllerAdded(deviceIndex)
+                return
+    
+    
+    def _displayStatus(self):
+        """Internal function which draws the status display of each controller in its part of the
+           window. Returns the areas of the window which need updating on the display.
+        """
+        dirtyRects = []
+        for controller in self.controllers:
+            offset = controller.screen.get_offset()
+            if controller.displayControllerOutput == True:
+                controller._displayStatus()
+                dirtyRects.extend( rect.move(offset) for rect in controller.textPrint.finishUpdate() )
+            elif controller._statusDisplayed:
+                controller.screen.fill(TextPrint.WHITE)
+                dirtyRects.append( controller.screen.get_rect().move(offset) )
+            controller._statusDisplayed = controller.displayControllerOutput
+        return dirtyRects
+
 
 ## --- Test functions for this module below this line ---
 def initStatusHandler( status ):
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+""" Input backends supplying the joysticks a RobotController detects and reads. The default
+    PygameBackend uses the joysticks connected to the computer. The VirtualBackend supplies
+    VirtualJoystick objects controlled from your code instead, so everything (including detecting
+    the controller) can run on a machine with no game controller or display.
+
+    A backend provides these functions:
+        init(): Initialises the parts of pygame needed to count the joysticks and read events.
+        quit(): Shuts down pygame.
+        getCount(): Returns the number of joysticks.
+        waitForJoystick(timeout): Waits up to timeout seconds for a joystick to be connected.
+            Returns True if one may have been, or False if the time ran out.
+        getJoystick(index): Returns the joystick with the given index, which has the same functions
+            as a pygame Joystick.
+        update(): Called once each time the controller is read, before reading it.
+"""
+import threading
+import time
+
+import pygame
+
+from .profiles import AXIS_CONTROLS, BUTTON_CONTROLS, HAT_CONTROLS, ControllerProfile, loadDefaultProfiles
+
+
+class PygameBackend:
+    """ Backend using the joysticks connected to the computer through pygame """
+
+    def init(self):
+        """ Initialises the pygame joystick module, and the display module which the pygame event
+            queue needs. Other pygame modules (e.g. sound) are not needed, so are not started.
+        """
+        pygame.display.init()
+        pygame.joystick.init()
+
+    def quit(self):
+        """ Shuts down pygame """
+        pygame.quit()
+
+    def getCount(self):
+        """ Returns the number of joysticks connected """
+        return pygame.joystick.get_count()
+
+    def getJoystick(self, index):
+        """ Returns the pygame Joystick with the given index """
+        return pygame.joystick.Joystick(index)
+
+    def waitForJoystick(self, timeout):
+        """ Waits for pygame to report a joystick was connected """
+        if not hasattr(pygame, "JOYDEVICEADDED"):
+            #Pygame 1 only finds newly paired joysticks when it is restarted
+            time.sleep(timeout)
+            self.quit()
+            self.init()
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            event = pygame.event.wait( max(1, int(remaining * 1000)) )
+            if event.type == pygame.JOYDEVICEADDED:
+                return True
+            if event.type == pygame.NOEVENT:
+                return False
+
+    def update(self):
+        """ Nothing to do, as pygame updates the joysticks itself """
+        pass
+
+
+class VirtualBackend:
+    """ Backend supplying virtual joysticks. Joysticks can be connected after the backend is
+        created, e.g. to test what happens while a controller is not yet paired.
+
+        Args:
+            joysticks: The VirtualJoystick objects connected to start with
+    """
+
+    def __init__(self, joysticks = ()):
+        self.joysticks = list(joysticks)
+        self._connected = threading.Event()
+
+    def connect(self, joystick):
+        """ Connects another virtual joystick. This can be called from another thread while the
+            RobotController is waiting for a controller to be connected.
+        """
+        self.joysticks.append(joystick)
+        self._connected.set()
+        if pygame.display.get_init() and hasattr(pygame, "JOYDEVICEADDED"):
+            pygame.event.post( pygame.event.Event(pygame.JOYDEVICEADDED, device_index=len(self.joysticks) - 1) )
+
+    def disconnect(self, joystick):
+        """ Disconnects a virtual joystick, as if it was unplugged or went out of range """
+        self.joysticks.remove(joystick)
+        if pygame.display.get_init() and hasattr(pygame, "JOYDEVICEREMOVED"):
+            pygame.event.post( pygame.event.Event(pygame.JOYDEVICEREMOVED, instance_id=joystick.instanceId) )
+
+    def init(self):
+        """ Initialises the pygame display module, which the pygame event queue needs """
+        pygame.display.init()
+
+    def quit(self):
+        """ Shuts down pygame """
+        pygame.quit()
+
+    def getCount(self):
+        """ Returns the number of virtual joysticks connected """
+        return len(self.joysticks)
+
+    def getJoystick(self, index):
+        """ Returns the virtual joystick with the given index """
+        return self.joysticks[index]
+
+    def waitForJoystick(self, timeout):
+        """ Waits for connect() to be called """
+        connected = self._connected.wait(timeout)
+        self._connected.clear()
+        return connected
+
+    def update(self):
+        """ Moves the controls of each virtual joystick being driven by a generator on one step """
+        for joystick in self.joysticks:
+            joystick.step()
+
+
+class VirtualJoystick:
+    """ A joystick controlled from your code, impersonating one of the supported controllers. It
+        reports the name and numbers of axes, buttons and hats of the controller's profile, so it is
+        detected as that controller, and its controls are set using the profile's control names.
+        Each change is also posted to the pygame event queue as a joystick event, so event driven
+        mode works too.
+
+        Controls can be set directly (setControl(), press(), release()) or by a generator passed to
+        drive(), which is moved on one step each time the controller is read.
+
+        Args:
+            profile: The ControllerProfile to impersonate, or the name of one of the supported
+                controller profiles (e.g. "Wireless Controller")
+
+            instanceId: The instance id reported for the joystick. This should be different from
+                the ids of any other joysticks.
+    """
+
+    def __init__(self, profile, instanceId = 1000):
+        if not isinstance(profile, ControllerProfile):
+            name = profile
+            profile = loadDefaultProfiles().findByName(name)
+            if profile is None:
+                raise ValueError("No supported controller profile named {}".format(name))
+        self.profile = profile
+        self.instanceId = instanceId
+        self.axes = [0.0] * profile.axes
+        self.buttons = [0] * profile.buttons
+        self.hats = [(0, 0)] * profile.hats
+        self._generator = None
+
+    #Functions matching the pygame Joystick class
+    def init(self):
+        pass
+
+    def quit(self):
+        pass
+
+    def get_init(self):
+        return True
+
+    def get_name(self):
+        return self.profile.name
+
+    def get_id(self):
+        return self.instanceId
+
+    def get_instance_id(self):
+        return self.instanceId
+
+    def get_guid(self):
+        return "virtual"
+
+    def get_numaxes(self):
+        return len(self.axes)
+
+    def get_numbuttons(self):
+        return len(self.buttons)
+
+    def get_numhats(self):
+        return len(self.hats)
+
+    def get_axis(self, axis):
+        return self.axes[axis]
+
+    def get_button(self, button):
+        return self.buttons[button]
+
+    def get_hat(self, hat):
+        return self.hats[hat]
+
+    #Functions for controlling the virtual joystick
+    def setAxis(self, axis, value):
+        """ Sets the value (-1 to 1) of an axis by index """
+        if self.axes[axis] != value:
+            self.axes[axis] = value
+            self._post(pygame.JOYAXISMOTION, axis=axis, value=value)
+
+    def setButton(self, button, state):
+        """ Sets the state (0 or 1) of a button by index """
+        if self.buttons[button] != state:
+            self.buttons[button] = state
+            self._post(pygame.JOYBUTTONDOWN if state else pygame.JOYBUTTONUP, button=button)
+
+    def setHat(self, hat, value):
+        """ Sets the (left/right, up/down) value of a hat by index """
+        value = tuple(value)
+        if self.hats[hat] != value:
+            self.hats[hat] = value
+            self._post(pygame.JOYHATMOTION, hat=hat, value=value)
+
+    def setControl(self, control, value):
+        """ Sets a control by its name in the controller profile (e.g. "leftStickLR", "crossBBtn"
+            or "hat"). "leftStick" and "rightStick" set both axes of a stick from a (left/right,
+            up/down) tuple. Raises ValueError if the controller does not have the control.
+        """
+        if control in ("leftStick", "rightStick"):
+            self.setControl(control + "LR", value[0])
+            self.setControl(control + "UD", value[1])
+            return
+        index = getattr(self.profile, control, -1) if control in AXIS_CONTROLS + BUTTON_CONTROLS + HAT_CONTROLS else -1
+        if index == -1:
+            raise ValueError("{} has no control {}".format(self.profile.displayName, control))
+        if control in AXIS_CONTROLS:
+            self.setAxis(index, value)
+        elif control in BUTTON_CONTROLS:
+            self.setButton(index, value)
+        else:
+            self.setHat(index, value)
+
+    def press(self, control):
+        """ Presses the button with the given name in the controller profile """
+        self.setControl(control, 1)
+
+    def release(self, control):
+        """ Releases the button with the given name in the controller profile """
+        self.setControl(control, 0)
+
+    def drive(self, generator):
+        """ Drives the controls from a generator (or any iterator). Each step yields a dictionary of
+            control names (as for setControl()) and the values to set them to, or None to leave the
+            controls unchanged for that step. One step is taken each time the controller is read,
+            until the generator finishes.
+        """
+        self._generator = iter(generator)
+
+    @property
+    def driving(self):
+        """ True while the joystick is being driven by a generator """
+        return self._generator is not None
+
+    def step(self):
+        """ Takes the next step of the generator driving the joystick, if there is one """
+        if self._generator is None:
+            return
+        try:
+            changes = next(self._generator)
+        except StopIteration:
+            self._generator = None
+            return
+        if changes:
+            for control, value in changes.items():
+                self.setControl(control, value)
+
+    def _post(self, eventType, **attributes):
+        """ Internal function posting a joystick event to the pygame event queue, if it is running """
+        if pygame.display.get_init():
+            pygame.event.post( pygame.event.Event(eventType, joy=self.instanceId,
+                                                  instance_id=self.instanceId, **attributes) )
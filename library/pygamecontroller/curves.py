@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+""" Response curves shaping the values of analogue sticks and triggers before they are passed to
+    callback functions, e.g. to give finer control near the centre of a stick.
+"""
+import math
+from array import array
+
+
+class ResponseCurve:
+    """ A response curve compiled into a lookup table, so shaping a value costs one table lookup
+        and an interpolation between the two nearest entries, however complex the curve is.
+        Create curves once at start up, then swap them while running (e.g. for slow and turbo
+        modes) with RobotController.setResponseCurve().
+
+        Curves map stick values from -1 to 1. Use the expo(), power(), linear() and piecewise()
+        functions to create the common curves, or pass any function to the constructor.
+
+        Args:
+            function: A function taking a value from -1 to 1 and returning the shaped value
+
+            resolution: The number of steps in the lookup table between -1 and 1. This must be even,
+                so 0 is an entry in the table and the rest position of a stick is never moved.
+    """
+
+    RESOLUTION = 256
+
+    def __init__(self, function, resolution = RESOLUTION):
+        if resolution < 2 or resolution % 2 != 0:
+            raise ValueError("Response curve resolution must be an even number of at least 2")
+        self.function = function
+        self.resolution = resolution
+        self._scale = resolution / 2.0
+        self._table = array("d", [function(index / self._scale - 1.0) for index in range(resolution + 1)])
+
+    def apply(self, value):
+        """ Returns the shaped value for a value from -1 to 1. Values outside this range are
+            treated as -1 or 1.
+        """
+        position = (value + 1.0) * self._scale
+        if position <= 0.0:
+            return self._table[0]
+        index = int(position)
+        if index >= self.resolution:
+            return self._table[self.resolution]
+        low = self._table[index]
+        return low + (self._table[index + 1] - low) * (position - index)
+
+    def forTrigger(self):
+        """ Returns the curve compiled for a trigger. The curve is applied to how far the trigger is
+            pressed, from 0 at rest to 1 when fully pressed, and the result is passed on in the
+            usual range of -1 at rest to 1 when fully pressed.
+        """
+        function = self.function
+        return ResponseCurve(lambda value: 2.0 * function( (value + 1.0) / 2.0 ) - 1.0, self.resolution)
+
+    @classmethod
+    def linear(cls, gain = 1.0, resolution = RESOLUTION):
+        """ Returns a curve multiplying values by the gain, e.g. 0.5 to limit a robot to half speed """
+        return cls(lambda value: gain * value, resolution)
+
+    @classmethod
+    def expo(cls, amount, gain = 1.0, resolution = RESOLUTION):
+        """ Returns an exponential curve as used for radio control models, blending the value with
+            its cube. An amount of 0 gives a straight line, and 1 gives the softest response around
+            the centre. The result is multiplied by the gain.
+        """
+        if not 0.0 <= amount <= 1.0:
+            raise ValueError("Expo amount must be from 0 to 1")
+        return cls(lambda value: gain * ( (1.0 - amount) * value + amount * value ** 3 ), resolution)
+
+    @classmethod
+    def power(cls, exponent, gain = 1.0, resolution = RESOLUTION):
+        """ Returns a curve raising the size of values to the exponent, keeping their sign. Exponents
+            above 1 soften the response around the centre, and below 1 sharpen it. The result is
+            multiplied by the gain.
+        """
+        if exponent <= 0.0:
+            raise ValueError("Power curve exponent must be greater than 0")
+        return cls(lambda value: gain * math.copysign(abs(value) ** exponent, value), resolution)
+
+    @classmethod
+    def piecewise(cls, points, resolution = RESOLUTION):
+        """ Returns a curve joining a list of (value, shaped value) points with straight lines,
+            e.g. [(0, 0), (0.5, 0.2), (1, 1)]. Values beyond the first or last point give the shaped
+            value of that point. If the first point is not below 0, the curve is mirrored for
+            negative values, so only the positive half needs to be given.
+        """
+        points = [(float(value), float(shaped)) for value, shaped in points]
+        if len(points) < 2:
+            raise ValueError("A piecewise curve needs at least 2 points")
+        for (value, shaped), (nextValue, nextShaped) in zip(points, points[1:]):
+            if nextValue <= value:
+                raise ValueError("The points of a piecewise curve must be in order of increasing value")
+        mirrored = points[0][0] >= 0.0
+
+        def interpolate(value):
+            if mirrored and value < 0.0:
+                return -interpolate(-value)
+            if value <= points[0][0]:
+                return points[0][1]
+            for (start, startShaped), (end, endShaped) in zip(points, points[1:]):
+                if value <= end:
+                    return startShaped + (endShaped - startShaped) * (value - start) / (end - start)
+            return points[-1][1]
+        return cls(interpolate, resolution)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+""" Classes controlling how the RobotController calls the callback functions for each control. """
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """ Limits how often the callback function for a control is called. When the control changes
+        again before the callback is due, the new value replaces any value already waiting, so the
+        callback is always passed the latest value. A value left waiting is passed on as soon as
+        the callback is due again, so the final position of a control is never lost.
+
+        Args:
+            maxRate: The maximum number of times per second the callback function will be called
+    """
+
+    def __init__(self, maxRate):
+        if maxRate <= 0:
+            raise ValueError("Maximum callback rate must be greater than 0")
+        self.maxRate = maxRate
+        self.interval = 1.0 / maxRate
+        #Count of values replaced by a later value before being passed to the callback
+        self.coalesced = 0
+        self._lastCall = None
+        self._pending = None
+
+    def call(self, callback, args, now):
+        """ Calls the callback function with the args if it is due at the time now, otherwise
+            keeps the args to pass to the callback when it is next due.
+        """
+        if self._lastCall is None or now - self._lastCall >= self.interval:
+            self._lastCall = now
+            self._pending = None
+            callback(*args)
+        else:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = (callback, args)
+
+    def flush(self, now):
+        """ Calls the callback function with the latest waiting value, if there is one and the
+            callback is due at the time now.
+        """
+        if self._pending is not None and now - self._lastCall >= self.interval:
+            callback, args = self._pending
+            self._pending = None
+            self._lastCall = now
+            callback(*args)
+
+    def flushPending(self, now):
+        """ Calls the callback function with the latest waiting value straight away, if there is
+            one, whether or not the callback is due. Used when the limit is replaced or removed,
+            so the final value is not lost with the limiter.
+        """
+        if self._pending is not None:
+            callback, args = self._pending
+            self._pending = None
+            self._lastCall = now
+            callback(*args)
+
+
+class InlineDispatch:
+    """ Calls the callback function for a control straight away on the thread reading the controller,
+        timing each call. A call taking longer than the budget is counted as an overrun and passed
+        to the onOverrun function.
+
+        Args:
+            budget: The time in seconds a call to the callback function is expected to take at most,
+                or None to only record the time taken
+
+            onOverrun: Function passed the control name, the time taken and the budget each time a
+                call takes longer than the budget
+    """
+
+    def __init__(self, budget = None, onOverrun = None):
+        if budget is not None and budget <= 0:
+            raise ValueError("Callback time budget must be greater than 0")
+        self.budget = budget
+        self.onOverrun = onOverrun
+        #Count of calls which took longer than the budget, and the longest time a call has taken
+        self.overruns = 0
+        self.worstTime = 0.0
+        #LatencyHistogram recording the time taken by every call, when callback timing is enabled
+        self.histogram = None
+
+    def call(self, control, callback, args):
+        """ Calls the callback function with the args """
+        start = time.monotonic()
+        callback(*args)
+        self._timed(control, time.monotonic() - start)
+
+    def _timed(self, control, duration):
+        """ Internal function recording the time taken by a call """
+        if self.histogram is not None:
+            self.histogram.record(duration)
+        if duration > self.worstTime:
+            self.worstTime = duration
+        if self.budget is not None and duration > self.budget:
+            self.overruns += 1
+            if self.onOverrun is not None:
+                self.onOverrun(control, duration, self.budget)
+
+
+class WorkerDispatch(InlineDispatch):
+    """ Calls the callback function for a control on a thread of a WorkerPool, so a slow callback
+        function does not hold up reading the controller. Calls for the same control are made one
+        at a time in the order the changes happened.
+
+        Args:
+            pool: The WorkerPool running the calls
+
+            latestWins: When True, a change waiting for an earlier call to finish is replaced by any
+                later change, so the callback is always passed the latest value and never falls behind.
+                When False, every change is passed on.
+
+            budget, onOverrun: As for InlineDispatch
+    """
+
+    def __init__(self, pool, latestWins = False, budget = None, onOverrun = None):
+        super().__init__(budget, onOverrun)
+        self.pool = pool
+        self.latestWins = latestWins
+        #Count of changes replaced by a later change before the callback function was called
+        self.dropped = 0
+        self._waiting = deque()
+        self._scheduled = False
+
+    def call(self, control, callback, args):
+        """ Queues a call of the callback function with the args, returning without waiting for it """
+        with self.pool.lock:
+            if self.latestWins and self._waiting:
+                self._waiting.clear()
+                self.dropped += 1
+            self._waiting.append( (callback, args) )
+            if not self._scheduled:
+                self._scheduled = True
+                self.pool.schedule(self, control)
+
+    def _runNext(self, control):
+        """ Internal function run on a worker thread which makes the next waiting call """
+        with self.pool.lock:
+            callback, args = self._waiting.popleft()
+        try:
+            InlineDispatch.call(self, control, callback, args)
+        finally:
+            with self.pool.lock:
+                if self._waiting:
+                    #Go to the back of the queue so other controls get a turn
+                    self.pool.schedule(self, control)
+                else:
+                    self._scheduled = False
+
+
+class WorkerPool:
+    """ A pool of threads making the calls queued by WorkerDispatch objects. A new thread is started
+        whenever a call is ready and every thread is busy. As each control only has one call running
+        at a time, a slow callback function never holds up the calls for other controls.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        #First error raised by a callback function on a worker thread
+        self.error = None
+        self._ready = deque()
+        self._wake = threading.Condition(self.lock)
+        self._threads = []
+        self._idle = 0
+        self._stopping = False
+
+    def schedule(self, dispatch, control):
+        """ Queues the next call waiting in a WorkerDispatch. Must be called holding the pool lock. """
+        if self._stopping:
+            return
+        self._ready.append( (dispatch, control) )
+        if self._idle > 0:
+            #Hand the call to a waiting thread
+            self._idle -= 1
+            self._wake.notify()
+        else:
+            thread = threading.Thread(target=self._workerLoop, daemon=True,
+                                      name="RobotController callbacks {}".format(len(self._threads) + 1))
+            self._threads.append(thread)
+            thread.start()
+
+    def shutdown(self):
+        """ Stops the worker threads once their current calls finish, dropping any waiting calls """
+        with self.lock:
+            self._stopping = True
+            self._ready.clear()
+            self._wake.notify_all()
+
+    def _workerLoop(self):
+        """ Internal function run on each worker thread """
+        while True:
+            with self.lock:
+                while not self._ready and not self._stopping:
+                    #Counted as idle until a call is handed to it
+                    self._idle += 1
+                    self._wake.wait()
+                if self._stopping:
+                    return
+                dispatch, control = self._ready.popleft()
+            try:
+                dispatch._runNext(control)
+            except Exception as e:
+                #Report errors from callback functions on the main thread
+                if self.error is None:
+                    self.error = e
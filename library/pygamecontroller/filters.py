@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+""" Filters applied to the values read from the analogue sticks and triggers of a game controller
+    before they are passed to callback functions.
+"""
+import math
+
+
+class Deadzone:
+    """ Deadzone and minimum change filtering for an analogue stick or trigger.
+
+        Args:
+            radial: Stick positions closer to the centre than this distance are reported as the centre.
+                Positions outside the deadzone are scaled so the reported distance still runs smoothly
+                from 0 at the edge of the deadzone to 1 at the edge of the stick travel.
+
+            axial: Each stick axis closer to 0 than this value is reported as 0, or for a trigger,
+                positions closer to the rest position (-1) than this are reported as the rest position.
+                Values outside the deadzone are scaled in the same way as for the radial deadzone.
+
+            minChange: The smallest change in value which will be passed to the callback function.
+                Smaller changes are suppressed, except moves back to the rest position or to the
+                end of travel, which are always passed on so the final position is never lost.
+    """
+
+    def __init__(self, radial = 0.0, axial = 0.0, minChange = 0.0):
+        for name, value in (("radial", radial), ("axial", axial), ("minChange", minChange)):
+            if not 0.0 <= value < 1.0:
+                raise ValueError("Deadzone {} must be at least 0 and less than 1".format(name))
+        self.radial = radial
+        self.axial = axial
+        self.minChange = minChange
+        #Count of changed readings which did not result in a callback
+        self.suppressed = 0
+        self._lastRaw = None
+
+    def filterStick(self, x, y, lastX, lastY):
+        """ Applies the deadzones to a stick position. Returns the position to pass to the callback
+            function, or None if the callback should not be called because the position has not
+            changed enough since the last position passed on (lastX, lastY).
+        """
+        raw = (x, y)
+        rawChanged = raw != self._lastRaw
+        self._lastRaw = raw
+
+        if self.axial > 0.0:
+            x = self._scaleAxis(x, 0.0, 1.0)
+            y = self._scaleAxis(y, 0.0, 1.0)
+        if self.radial > 0.0:
+            distance = math.hypot(x, y)
+            if distance < self.radial:
+                x = y = 0.0
+            else:
+                scale = min(1.0, (distance - self.radial) / (1.0 - self.radial)) / distance
+                x *= scale
+                y *= scale
+
+        if x == lastX and y == lastY:
+            accept = False
+        elif (self.minChange > 0.0
+        and max(abs(x - lastX), abs(y - lastY)) < self.minChange
+        and not (x == 0.0 and y == 0.0)
+        and abs(x) < 1.0 and abs(y) < 1.0):
+            accept = False
+        else:
+            accept = True
+
+        if accept:
+            return x, y
+        if rawChanged:
+            self.suppressed += 1
+        return None
+
+    def filterTrigger(self, value, lastValue):
+        """ Applies the deadzone to a trigger position. Returns the position to pass to the callback
+            function, or None if the callback should not be called.
+        """
+        rawChanged = value != self._lastRaw
+        self._lastRaw = value
+
+        if self.axial > 0.0:
+            value = self._scaleAxis(value, -1.0, 2.0)
+
+        if value == lastValue:
+            accept = False
+        elif (self.minChange > 0.0
+        and abs(value - lastValue) < self.minChange
+        and -1.0 < value < 1.0):
+            accept = False
+        else:
+            accept = True
+
+        if accept:
+            return value
+        if rawChanged:
+            self.suppressed += 1
+        return None
+
+    def _scaleAxis(self, value, rest, travel):
+        """ Internal function applying the axial deadzone to a value which moves away from its rest
+            position by up to travel in either direction
+        """
+        offset = value - rest
+        if abs(offset) < self.axial:
+            return rest
+        scaled = min(travel, (abs(offset) - self.axial) * travel / (travel - self.axial))
+        return rest + math.copysign(scaled, offset)
+
+
+class SmoothingFilter:
+    """ Base class of the filters smoothing the values of one stick axis or trigger. Each filter
+        only keeps a few numbers of state, and is passed the time since the last tick with each
+        value, so it smooths the same whatever rate the controller is read at.
+
+        When the smoothed value comes within settle of the value read from the controller it is
+        set to that value, so the filter settles and the callback function stops being called.
+
+        Args:
+            settle: How close the smoothed value must come to the value read before it settles
+    """
+
+    def __init__(self, settle = 0.001):
+        if settle < 0.0:
+            raise ValueError("Smoothing settle distance must not be negative")
+        self.settle = settle
+        #The smoothed value, or None until the first value is read
+        self.value = None
+        #The last value read from the controller
+        self.target = None
+
+    @property
+    def settled(self):
+        """ True when the smoothed value has reached the last value read """
+        return self.value == self.target
+
+    def filter(self, value, dt):
+        """ Returns the smoothed value, given the value read and the time in seconds since the
+            previous tick
+        """
+        self.target = value
+        if self.value is None:
+            self.value = value
+            self._start(value)
+        elif self.value != value and dt > 0.0:
+            self._step(value, dt)
+            if abs(self.value - value) < self.settle:
+                self.value = value
+                self._start(value)
+        return self.value
+
+    def reset(self):
+        """ Forgets the smoothed value, so the next value read is passed on unchanged """
+        self.value = None
+        self.target = None
+
+    def _start(self, value):
+        """ Internal function which sets any other state when the value is set without smoothing """
+        pass
+
+    def _step(self, target, dt):
+        """ Internal function moving self.value towards the target over dt seconds """
+        raise NotImplementedError
+
+
+class LowPassFilter(SmoothingFilter):
+    """ Exponential moving average (first order low pass) filter, moving the smoothed value a
+        fraction of the way towards each value read, the fraction depending on the time step.
+
+        Args:
+            timeConstant: Seconds taken to move about 63% of the way to a new value. Larger values
+                smooth more but respond more slowly.
+    """
+
+    def __init__(self, timeConstant = 0.05, settle = 0.001):
+        super().__init__(settle)
+        if timeConstant <= 0.0:
+            raise ValueError("Low pass filter time constant must be greater than 0")
+        self.timeConstant = timeConstant
+
+    def _step(self, target, dt):
+        self.value += (target - self.value) * (1.0 - math.exp(-dt / self.timeConstant))
+
+
+class OneEuroFilter(SmoothingFilter):
+    """ One euro filter (Casiez, Roussel and Vogel, 2012). A low pass filter whose cutoff frequency
+        rises with the speed the value is changing, so a stick held still is smoothed heavily
+        while fast moves are passed on with little lag.
+
+        Args:
+            minCutoff: Cutoff frequency in Hz when the value is not changing. Lower values remove
+                more jitter.
+
+            beta: How much the cutoff frequency rises with the speed of change (in units per second).
+                Higher values reduce the lag on fast moves.
+
+            derivativeCutoff: Cutoff frequency in Hz of the filter smoothing the speed of change
+    """
+
+    def __init__(self, minCutoff = 1.0, beta = 0.5, derivativeCutoff = 1.0, settle = 0.001):
+        super().__init__(settle)
+        if minCutoff <= 0.0 or derivativeCutoff <= 0.0 or beta < 0.0:
+            raise ValueError("One euro filter cutoffs must be greater than 0 and beta must not be negative")
+        self.minCutoff = minCutoff
+        self.beta = beta
+        self.derivativeCutoff = derivativeCutoff
+        self._speed = 0.0
+
+    def _start(self, value):
+        self._speed = 0.0
+
+    def _step(self, target, dt):
+        speed = (target - self.value) / dt
+        self._speed += (speed - self._speed) * self._alpha(self.derivativeCutoff, dt)
+        cutoff = self.minCutoff + self.beta * abs(self._speed)
+        self.value += (target - self.value) * self._alpha(cutoff, dt)
+
+    def _alpha(self, cutoff, dt):
+        """ Internal function returning the smoothing factor for a cutoff frequency and time step """
+        return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+
+
+class CriticallyDampedFilter(SmoothingFilter):
+    """ Moves the smoothed value like a critically damped spring pulling it towards the value read.
+        It accelerates and slows down smoothly without overshooting, which suits servos.
+
+        Args:
+            responseTime: Roughly the seconds taken to reach a new value. Larger values smooth more
+                but respond more slowly.
+    """
+
+    def __init__(self, responseTime = 0.1, settle = 0.001):
+        super().__init__(settle)
+        if responseTime <= 0.0:
+            raise ValueError("Critically damped filter response time must be greater than 0")
+        self.responseTime = responseTime
+        self._velocity = 0.0
+
+    def _start(self, value):
+        self._velocity = 0.0
+
+    def _step(self, target, dt):
+        #Exact solution of the spring equation over the time step, so it is stable at any rate
+        omega = 2.0 / self.responseTime
+        offset = self.value - target
+        decay = math.exp(-omega * dt)
+        change = (self._velocity + omega * offset) * dt
+        self._velocity = (self._velocity - omega * change) * decay
+        self.value = target + (offset + change) * decay
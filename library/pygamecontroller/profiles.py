@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+""" Controller profiles describing how each supported game controller presents its controls
+    to pygame. Each profile is defined in its own JSON file in the controllers folder of this
+    package, so adding support for a new controller only needs one new file.
+
+    A profile file contains:
+        name: The text the controller presents itself as. A joystick is matched to a profile when
+            this text is found in the name reported for the joystick.
+        displayName: The name of the controller displayed in the application window.
+        notes: Optional notes about the controller (e.g. how its buttons are labelled).
+        axes: The number of axes the controller reports.
+        buttons: The minimum number of buttons the controller reports.
+        hats: The number of hats the controller reports.
+        controls: The index of each control present on the controller, keyed by control name.
+            Controls the controller does not have are left out.
+"""
+import json
+import os
+
+
+#Names of the controls a profile can define, grouped by the type of pygame input they are read from
+AXIS_CONTROLS = ("leftStickLR", "leftStickUD", "rightStickLR", "rightStickUD",
+                 "leftTrigger", "rightTrigger")
+
+BUTTON_CONTROLS = ("leftBtn1", "rightBtn1", "leftBtn2", "rightBtn2",
+                   "leftStickPress", "rightStickPress",
+                   "selectBtn", "homeBtn", "startBtn", "starBtn",
+                   "triangleXBtn", "squareYBtn", "circleABtn", "crossBBtn",
+                   "hatLeft", "hatRight", "hatUp", "hatDown")
+
+HAT_CONTROLS = ("hat",)
+
+#Folder containing the profiles for the controllers supported by this package
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "controllers")
+
+#Profile files of the supported controllers in the order they were listed in SUPPORTED_JOYSTICKS
+#before profiles were loaded from files, so the index of each controller (DETECTED_JOYSTICK_IDX)
+#and the order controllers are matched in are unchanged. Profiles added later are loaded after
+#these in order of file name.
+DEFAULT_PROFILE_ORDER = ("ps3-dualshock.json",
+                         "rock-candy-ps3.json",
+                         "pihut-usb.json",
+                         "argos-ps3.json",
+                         "ps4-wireless.json",
+                         "8bitdo-pro2-d-mode.json",
+                         "8bitdo-pro2-x-mode.json",
+                         "8bitdo-pro2-s-mode.json",
+                         "logitech-f710.json")
+
+
+class ControllerProfile:
+    """ The bindings of the controls of one model of game controller to pygame axis, button
+        and hat indices. Every control name in AXIS_CONTROLS, BUTTON_CONTROLS and HAT_CONTROLS is
+        an attribute holding the index of the control, or -1 if the controller does not have it.
+    """
+
+    def __init__(self, name, displayName, axes, buttons, hats, controls, notes = "", source = None):
+        self.name = name
+        self.displayName = displayName
+        self.axes = axes
+        self.buttons = buttons
+        self.hats = hats
+        self.notes = notes
+        #File the profile was loaded from, used in error messages
+        self.source = source
+        for control in AXIS_CONTROLS + BUTTON_CONTROLS + HAT_CONTROLS:
+            setattr(self, control, controls.get(control, -1))
+        self.validate(controls)
+
+    @classmethod
+    def fromFile(cls, path):
+        """ Loads a profile from a JSON profile file """
+        with open(path) as profileFile:
+            try:
+                data = json.load(profileFile)
+            except ValueError as e:
+                raise ValueError("Controller profile {} is not valid JSON: {}".format(path, e))
+        if not isinstance(data, dict):
+            raise ValueError("Controller profile {} must contain a JSON object".format(path))
+        missing = [key for key in ("name", "displayName", "axes", "buttons", "hats", "controls") if key not in data]
+        if missing:
+            raise ValueError("Controller profile {} is missing {}".format(path, ", ".join(missing)))
+        unknown = set(data) - {"name", "displayName", "notes", "axes", "buttons", "hats", "controls"}
+        if unknown:
+            raise ValueError("Controller profile {} has unknown keys {}".format(path, ", ".join(sorted(unknown))))
+        if not isinstance(data["controls"], dict):
+            raise ValueError("Controller profile {} controls must be a JSON object".format(path))
+        return cls(data["name"], data["displayName"], data["axes"], data["buttons"], data["hats"],
+                   data["controls"], data.get("notes", ""), path)
+
+    @property
+    def signature(self):
+        """ The numbers of axes and hats the controller reports, which must match exactly """
+        return (self.axes, self.hats)
+
+    def validate(self, controls):
+        """ Checks the profile is consistent, raising ValueError describing the first problem found """
+        where = self.source or self.name
+        for key in ("name", "displayName", "notes"):
+            if not isinstance(getattr(self, key), str):
+                raise ValueError("Controller profile {}: {} must be a string".format(where, key))
+        if not self.name:
+            raise ValueError("Controller profile {}: name must not be empty".format(where))
+        for key in ("axes", "buttons", "hats"):
+            count = getattr(self, key)
+            if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+                raise ValueError("Controller profile {}: {} must be a whole number of at least 0".format(where, key))
+
+        unknown = set(controls) - set(AXIS_CONTROLS + BUTTON_CONTROLS + HAT_CONTROLS)
+        if unknown:
+            raise ValueError("Controller profile {}: unknown controls {}".format(where, ", ".join(sorted(unknown))))
+
+        for names, count, kind in ((AXIS_CONTROLS, self.axes, "axis"),
+                                   (BUTTON_CONTROLS, self.buttons, "button"),
+                                   (HAT_CONTROLS, self.hats, "hat")):
+            used = {}
+            for control in names:
+                index = getattr(self, control)
+                if index == -1:
+                    continue
+                if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < count:
+                    raise ValueError("Controller profile {}: {} must be an {} index from 0 to {}".format(
+                        where, control, kind, count - 1))
+                if index in used:
+                    raise ValueError("Controller profile {}: {} and {} both use {} {}".format(
+                        where, used[index], control, kind, index))
+                used[index] = control
+
+        hatButtons = [getattr(self, control) != -1 for control in ("hatLeft", "hatRight", "hatUp", "hatDown")]
+        if any(hatButtons) and not all(hatButtons):
+            raise ValueError("Controller profile {}: hat buttons must define all of hatLeft, hatRight, hatUp and hatDown".format(where))
+
+    def matches(self, name, axes, buttons, hats):
+        """ Returns True if a joystick with the given name and number of controls uses this profile """
+        return (axes == self.axes and hats == self.hats and buttons >= self.buttons
+                and self.name in name)
+
+
+class ProfileRegistry:
+    """ A collection of controller profiles, indexed so a joystick can be matched to its profile
+        without checking every profile. Profiles are kept in the order they were added, which is
+        the order they are checked in when more than one could match a joystick.
+    """
+
+    def __init__(self, profiles = ()):
+        self.profiles = []
+        self._byName = {}
+        self._bySignature = {}
+        #Results of previous matches, as the same joystick is matched each time detection is retried
+        self._matches = {}
+        for profile in profiles:
+            self.add(profile)
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def __iter__(self):
+        return iter(self.profiles)
+
+    def add(self, profile):
+        """ Adds a profile to the registry """
+        if profile.name in self._byName:
+            raise ValueError("Controller profile {} has the same name as {}".format(
+                profile.source or profile.name, self._byName[profile.name].source or profile.name))
+        self.profiles.append(profile)
+        self._byName[profile.name] = profile
+        self._bySignature.setdefault(profile.signature, []).append(profile)
+        self._matches.clear()
+
+    def loadFile(self, path):
+        """ Loads a profile from a JSON file and adds it to the registry. Returns the profile """
+        profile = ControllerProfile.fromFile(path)
+        self.add(profile)
+        return profile
+
+    def loadDirectory(self, path, order = ()):
+        """ Loads every JSON profile file in a folder. The files named in order are loaded first,
+            in that order, followed by the rest in order of file name.
+        """
+        fileNames = [fileName for fileName in sorted(os.listdir(path)) if fileName.endswith(".json")]
+        first = [fileName for fileName in order if fileName in fileNames]
+        for fileName in first + [fileName for fileName in fileNames if fileName not in first]:
+            self.loadFile(os.path.join(path, fileName))
+
+    def index(self, profile):
+        """ Returns the position of a profile in the registry """
+        return self.profiles.index(profile)
+
+    def findByName(self, name):
+        """ Returns the profile with exactly the given name, or None """
+        return self._byName.get(name)
+
+    def match(self, name, axes, buttons, hats):
+        """ Returns the profile for a joystick with the given name and numbers of controls,
+            or None if no profile matches.
+        """
+        key = (name, axes, buttons, hats)
+        if key in self._matches:
+            return self._matches[key]
+        #Try a profile with exactly the name of the joystick first
+        profile = self._byName.get(name)
+        if profile is None or not profile.matches(name, axes, buttons, hats):
+            profile = None
+            #Otherwise look for the profile name within the joystick name, only checking the
+            #profiles for controllers with the same numbers of axes and hats
+            for candidate in self._bySignature.get( (axes, hats), () ):
+                if candidate.matches(name, axes, buttons, hats):
+                    profile = candidate
+                    break
+        self._matches[key] = profile
+        return profile
+
+    def explainMismatch(self, name, axes, buttons, hats):
+        """ Returns a message explaining why a joystick did not match a profile, for display
+            when a joystick is not recognised.
+        """
+        for profile in self.profiles:
+            if profile.name in name:
+                if axes != profile.axes:
+                    return "Joystick has {} axes. Expected {}.".format(axes, profile.axes)
+                if hats != profile.hats:
+                    return "Joystick has {} hats. Expected {}.".format(hats, profile.hats)
+                if buttons < profile.buttons:
+                    return "Joystick has {} buttons. Expected at least {}.".format(buttons, profile.buttons)
+        return "Unsupported joystick detected as " + name
+
+    def column(self, key):
+        """ Returns a tuple of one attribute of every profile, in registry order """
+        return tuple(getattr(profile, key) for profile in self.profiles)
+
+
+def loadDefaultProfiles():
+    """ Returns a registry containing the profiles of all the controllers supported by this package """
+    registry = ProfileRegistry()
+    registry.loadDirectory(PROFILES_DIR, DEFAULT_PROFILE_ORDER)
+    return registry
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+""" Recording of controller input to a compact binary log file, and reading logs back for replay.
+
+    A log file starts with a header holding the names of the controls in the log, then has one
+    fixed size record per change of a control:
+        timestamp: The time.monotonic() time of the change (8 byte float)
+        control: The position of the control name in the header (1 byte)
+        value1, value2: The values passed to the callback function for the control. Controls
+            with only one value leave value2 as 0. (4 byte floats)
+"""
+import struct
+
+
+#Identifies an input log file and the version of its format
+MAGIC = b"PGCLOG1\n"
+
+#Layout of each record in the log
+RECORD = struct.Struct("<dBff")
+
+#Layout of the length of the list of control names in the header
+HEADER_LENGTH = struct.Struct("<H")
+
+
+class InputRecorder:
+    """ Writes changes of controls to a log file. Records are collected in a buffer allocated up
+        front and written to the file in batches, so recording a change does not write to the file
+        or allocate any memory.
+
+        Args:
+            path: The log file to create
+
+            controlNames: The names of the controls which can be recorded
+
+            batchSize: The number of records collected before they are written to the file
+    """
+
+    def __init__(self, path, controlNames, batchSize = 1024):
+        if batchSize < 1:
+            raise ValueError("Recording batch size must be at least 1")
+        self.path = path
+        self._controlIndex = { name: index for index, name in enumerate(controlNames) }
+        self._buffer = bytearray(RECORD.size * batchSize)
+        self._offset = 0
+        #Count of records written
+        self.records = 0
+        names = "\n".join(controlNames).encode("utf-8")
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + HEADER_LENGTH.pack(len(names)) + names)
+
+    def record(self, timestamp, control, values):
+        """ Records a change of the named control to the values (a tuple of one or two numbers) """
+        if len(values) == 1:
+            RECORD.pack_into(self._buffer, self._offset, timestamp, self._controlIndex[control], values[0], 0.0)
+        else:
+            RECORD.pack_into(self._buffer, self._offset, timestamp, self._controlIndex[control], values[0], values[1])
+        self._offset += RECORD.size
+        self.records += 1
+        if self._offset == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """ Writes the collected records to the file """
+        if self._file.closed:
+            #Stopped while another thread was recording
+            self._offset = 0
+            return
+        if self._offset:
+            self._file.write( memoryview(self._buffer)[:self._offset] )
+            self._offset = 0
+        self._file.flush()
+
+    def close(self):
+        """ Writes any collected records and closes the file """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+def readInputLog(path):
+    """ Reads a log file. Returns the names of the controls in the log and an iterator of
+        (timestamp, control index, value1, value2) tuples, one for each record.
+    """
+    with open(path, "rb") as logFile:
+        data = logFile.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("{} is not an input log file".format(path))
+    start = len(MAGIC) + HEADER_LENGTH.size
+    namesLength, = HEADER_LENGTH.unpack_from(data, len(MAGIC))
+    names = data[start:start + namesLength].decode("utf-8").split("\n")
+    records = memoryview(data)[start + namesLength:]
+    #Ignore a part record left by a recording which was not closed
+    records = records[:len(records) - len(records) % RECORD.size]
+    return names, RECORD.iter_unpack(records)
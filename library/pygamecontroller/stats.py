@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+""" Classes recording how long the RobotController spends on its work, so slow callback functions
+    and overloaded loops can be found on the robot itself.
+"""
+import csv
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+
+#Upper bounds in seconds of the latency histogram buckets. A last bucket holds all longer times.
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005,
+                   0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
+class LatencyHistogram:
+    """ Counts of how many times fell into each of a fixed set of buckets. Recording a time only
+        updates a few counters, so it is cheap enough to do for every callback.
+
+        Args:
+            bounds: Upper bounds of the buckets in seconds, in increasing order
+    """
+
+    def __init__(self, bounds = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        """ Clears all the recorded times """
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, duration):
+        """ Records a time in seconds """
+        self.counts[bisect_left(self.bounds, duration)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.maximum:
+            self.maximum = duration
+
+    @property
+    def mean(self):
+        """ The mean of the recorded times, or 0 if none have been recorded """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """ Returns the upper bound of the bucket containing the given fraction (0 to 1) of the
+            recorded times, which no more than that fraction of the times exceeded. This is never
+            more than the longest time recorded.
+        """
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target and seen > 0:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def stats(self):
+        """ Returns a dictionary of the count, mean, 50th, 90th and 99th percentiles and maximum of
+            the recorded times, and the count in each bucket keyed by its upper bound (None for the
+            last bucket). Times are in seconds.
+        """
+        buckets = dict(zip(self.bounds + (None,), self.counts))
+        return {"count": self.count, "mean": self.mean,
+                "p50": self.percentile(0.5), "p90": self.percentile(0.9), "p99": self.percentile(0.99),
+                "max": self.maximum, "buckets": buckets}
+
+    def summary(self):
+        """ Returns a one line summary of the recorded times in milliseconds """
+        return "{} calls, mean {:.2f}ms, p99 {:.2f}ms, max {:.2f}ms".format(
+            self.count, self.mean * 1000, self.percentile(0.99) * 1000, self.maximum * 1000)
+
+
+#Parts of each tick of the RobotController loop timed by a LoopTimer, in the order they happen.
+#"app" is the time spent in the application between calls of controllerStatus().
+LOOP_PHASES = ("app", "events", "input", "callbacks", "render", "flip", "sleep")
+EVENTS_PHASE, INPUT_PHASE, CALLBACKS_PHASE, RENDER_PHASE, FLIP_PHASE, SLEEP_PHASE = range(1, len(LOOP_PHASES))
+
+#Timing of one tick of the RobotController loop. The times of each phase, and the period from the
+#end of the previous tick, are in seconds. missed is True if the tick took longer than the period
+#of the input rate even without sleeping.
+LoopTiming = namedtuple("LoopTiming", ("timestamp",) + LOOP_PHASES + ("period", "missed") )
+
+
+class LoopTimer:
+    """ Records how long each phase of each tick of the RobotController loop took in a ring buffer
+        holding the most recent ticks. The buffer is allocated up front, so recording a tick does
+        not allocate any memory.
+
+        Args:
+            size: The number of ticks kept in the buffer
+
+            interval: The period in seconds of the input rate, or 0 if the rate is not limited
+    """
+
+    def __init__(self, size = 1000, interval = 0.0):
+        if size < 1:
+            raise ValueError("Loop timing buffer size must be at least 1")
+        self.size = size
+        self.interval = interval
+        #Id of the thread running the loop, so callbacks run on other threads are not counted
+        self.threadId = None
+        self.reset()
+
+    def reset(self):
+        """ Clears all the recorded ticks """
+        self._timestamps = array("d", bytes(8 * self.size))
+        self._phases = [array("d", bytes(8 * self.size)) for phase in LOOP_PHASES]
+        self._periods = array("d", bytes(8 * self.size))
+        self._missed = bytearray(self.size)
+        self._next = 0
+        #Number of ticks recorded, and ticks which missed their deadline, since the timer was reset
+        self.ticks = 0
+        self.missedDeadlines = 0
+        #Time taken by callback functions so far in the current phase
+        self.callbackTime = 0.0
+        self._current = [0.0] * len(LOOP_PHASES)
+        self._mark = None
+        self._lastEnd = None
+
+    def startTick(self):
+        """ Marks the start of the work of a tick. The time since the end of the last tick is
+            recorded as application time.
+        """
+        self.threadId = threading.get_ident()
+        now = time.monotonic()
+        if self._lastEnd is not None:
+            self._current[0] = now - self._lastEnd
+        self._mark = now
+        self.callbackTime = 0.0
+
+    def phase(self, index):
+        """ Records the time since the last mark as the phase with the given index in LOOP_PHASES.
+            Time taken by callback functions during the phase is recorded as callback time.
+        """
+        if self._mark is None:
+            #Enabled part way through a tick
+            return
+        now = time.monotonic()
+        self._current[index] += now - self._mark - self.callbackTime
+        self._current[CALLBACKS_PHASE] += self.callbackTime
+        self.callbackTime = 0.0
+        self._mark = now
+
+    def endTick(self):
+        """ Stores the times recorded for the tick in the buffer """
+        if self._mark is None:
+            return
+        now = time.monotonic()
+        current = self._current
+        slot = self._next
+        period = now - self._lastEnd if self._lastEnd is not None else sum(current)
+        missed = self.interval > 0 and period - current[SLEEP_PHASE] > self.interval
+        self._timestamps[slot] = now
+        for index, times in enumerate(self._phases):
+            times[slot] = current[index]
+            current[index] = 0.0
+        self._periods[slot] = period
+        self._missed[slot] = missed
+        self._next = (slot + 1) % self.size
+        self.ticks += 1
+        if missed:
+            self.missedDeadlines += 1
+        self._lastEnd = now
+
+    def timings(self):
+        """ Returns a list of LoopTiming tuples for the ticks in the buffer, oldest first """
+        count = min(self.ticks, self.size)
+        first = (self._next - count) % self.size
+        result = []
+        for n in range(count):
+            slot = (first + n) % self.size
+            result.append( LoopTiming(self._timestamps[slot], *[times[slot] for times in self._phases],
+                                      self._periods[slot], bool(self._missed[slot])) )
+        return result
+
+    def stats(self):
+        """ Returns a dictionary summarising the ticks in the buffer: the number of ticks, the achieved
+            rate in ticks per second, the mean and worst period, the number of missed deadlines and
+            the mean time of each phase. Times are in seconds.
+        """
+        timings = self.timings()
+        result = {"ticks": len(timings), "rate": 0.0, "meanPeriod": 0.0, "worstPeriod": 0.0,
+                  "missed": sum(timing.missed for timing in timings)}
+        for phase in LOOP_PHASES:
+            result[phase] = 0.0
+        if timings:
+            total = sum(timing.period for timing in timings)
+            result["rate"] = len(timings) / total if total > 0 else 0.0
+            result["meanPeriod"] = total / len(timings)
+            result["worstPeriod"] = max(timing.period for timing in timings)
+            for phase in LOOP_PHASES:
+                result[phase] = sum(getattr(timing, phase) for timing in timings) / len(timings)
+        return result
+
+    def dump(self, path):
+        """ Writes the ticks in the buffer to a CSV file, with times in seconds """
+        with open(path, "w", newline="") as dumpFile:
+            writer = csv.writer(dumpFile)
+            writer.writerow(LoopTiming._fields)
+            for timing in self.timings():
+                writer.writerow(timing)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+""" Watchdog calling a safe stop function when input reports stop arriving from a controller. """
+import threading
+import time
+
+
+class Watchdog:
+    """ Calls a safe stop function when no input reports have been received for a time, e.g. because
+        the link to a wireless controller has failed while the controls were frozen away from rest.
+        The watchdog runs on its own thread, sleeping until the deadline after the last report, so
+        the safe stop is called on time even when the thread reading the controller is blocked.
+
+        The safe stop is called within the timeout plus the time it takes the watchdog thread to
+        get the Python interpreter lock, which is at most the thread switch interval
+        (sys.getswitchinterval(), 5ms by default) unless another thread holds the lock in a long
+        running call into a C library. The safe stop function is called on the watchdog thread,
+        so must be safe to run alongside your main loop code.
+
+        Args:
+            timeout: Seconds without an input report before the safe stop function is called
+
+            lastReport: A function returning the time.monotonic() time of the last input report
+
+            safeStop: The function called (with no arguments) when the reports stop. It is called
+                once each time the reports stop, not again until they have resumed.
+
+            resumed: An optional function called (with no arguments) on the watchdog thread when
+                reports arrive again after the safe stop was called. This is checked every quarter
+                of the timeout.
+    """
+
+    def __init__(self, timeout, lastReport, safeStop, resumed = None):
+        if timeout <= 0:
+            raise ValueError("Watchdog timeout must be greater than 0")
+        self.timeout = timeout
+        self.safeStop = safeStop
+        self.resumed = resumed
+        self._lastReport = lastReport
+        #True from when the safe stop is called until input reports arrive again
+        self.tripped = False
+        #Count of times the safe stop has been called
+        self.trips = 0
+        #Latest the safe stop has been called after its deadline, in seconds
+        self.worstLateness = 0.0
+        #First error raised by the safe stop or resumed function
+        self.error = None
+        self._trippedReport = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name="RobotController watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stops the watchdog thread and waits for it to finish """
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _watch(self):
+        """ Internal function run on the watchdog thread """
+        try:
+            while not self._stop.is_set():
+                lastReport = self._lastReport()
+                if self.tripped:
+                    if lastReport != self._trippedReport:
+                        self.tripped = False
+                        if self.resumed is not None:
+                            self.resumed()
+                    else:
+                        self._stop.wait(self.timeout / 4)
+                    continue
+                deadline = lastReport + self.timeout
+                now = time.monotonic()
+                if now < deadline:
+                    #Sleep until the deadline, then check whether a report arrived in the meantime
+                    self._stop.wait(deadline - now)
+                    continue
+                self.tripped = True
+                self._trippedReport = lastReport
+                self.trips += 1
+                if now - deadline > self.worstLateness:
+                    self.worstLateness = now - deadline
+                self.safeStop()
+        except Exception as e:
+            #Report errors from the safe stop function on the main thread
+            self.error = e